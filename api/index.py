@@ -0,0 +1,277 @@
+import io
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask_cors import CORS
+
+# The scoring engine lives at the repository root, next to the Streamlit modules
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from carbon_engine import CarbonScoringEngine, clean_transactions  # noqa: E402
+from note_classifier import get_classifier  # noqa: E402
+
+# -----------------------------------------------------------------------------
+# HEADLESS SCORING API  (POST /api/calculate)
+# -----------------------------------------------------------------------------
+# Scores batches of transactions with the same engine as the dashboard, without
+# loading Streamlit. The body is read and scored in chunks of BATCH_ROWS and the
+# result is streamed back as JSON lines: one line per scored transaction, then a
+# final {"summary": ...} line with totals and per-category rollups.
+#
+# Accepted bodies:
+#   - JSON lines (application/x-ndjson or application/jsonl), one transaction per line
+#   - CSV (text/csv), same columns as the household transactions export
+#   - multipart/form-data with the CSV or JSON lines file in a "file" field
+#   - a JSON array of transactions (application/json), for small batches
+# Each transaction needs an Amount; Category/Subcategory default to Other/General,
+# and an optional Note refines the factor (note_class names the matched rule).
+# Rows with an Income/Expense column other than "Expense", or a Currency other
+# than INR, are skipped (as the dashboard does) and counted in the summary.
+#
+# Query parameters: rows=0 to stream only the summary line.
+#
+# Local run: flask --app api/index.py run   (benchmark: python api/index.py)
+
+BATCH_ROWS = int(os.environ.get("ECOPAY_API_BATCH_ROWS", "5000"))
+ROW_FIELDS = ["row", "Category", "Subcategory", "note_class", "Amount", "factor", "carbon_kg", "eco_score"]
+
+app = Flask(__name__)
+CORS(app)
+
+
+class BadRequest(ValueError):
+    """Raised for bodies the API can't score; reported as HTTP 400."""
+
+
+def _lines(stream, chunk_size=1 << 16):
+    """
+    Lines of a byte stream, read in large chunks (iterating a WSGI input stream
+    directly reads it a few bytes at a time).
+    """
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _json_line_batches(stream, batch_rows):
+    """Frames of up to batch_rows transactions from a JSON lines byte stream."""
+    batch = []
+    for line_no, line in enumerate(_lines(stream), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise BadRequest(f"Line {line_no} is not valid JSON: {e}")
+        if not isinstance(record, dict):
+            raise BadRequest(f"Line {line_no} must be a JSON object")
+        batch.append(record)
+        if len(batch) >= batch_rows:
+            yield pd.DataFrame.from_records(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch)
+
+
+def _csv_batches(stream, batch_rows):
+    """Frames of up to batch_rows transactions from a CSV byte stream."""
+    try:
+        yield from pd.read_csv(stream, chunksize=batch_rows)
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise BadRequest(f"Could not parse CSV: {e}")
+    except pd.errors.EmptyDataError:
+        return
+
+
+def request_batches(batch_rows=BATCH_ROWS):
+    """Transaction frames from the current request body, chosen by content type."""
+    mimetype = request.mimetype
+    if mimetype == "multipart/form-data":
+        upload = request.files.get("file")
+        if upload is None:
+            raise BadRequest("Multipart uploads need a 'file' field")
+        name = (upload.filename or "").lower()
+        is_json_lines = name.endswith((".jsonl", ".ndjson")) or upload.mimetype in ("application/x-ndjson", "application/jsonl")
+        # Form parsing has already spooled the whole upload; keep our own handle to
+        # it, since the spooled file may be closed before the response finishes
+        stream = io.BytesIO(upload.read())
+        return _json_line_batches(stream, batch_rows) if is_json_lines else _csv_batches(stream, batch_rows)
+    if mimetype in ("application/x-ndjson", "application/jsonl", "application/json-lines"):
+        return _json_line_batches(request.stream, batch_rows)
+    if mimetype in ("text/csv", "application/csv"):
+        return _csv_batches(request.stream, batch_rows)
+    if mimetype == "application/json":
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get("transactions")
+        if not isinstance(payload, list):
+            raise BadRequest("JSON bodies must be an array of transactions (or {\"transactions\": [...]})")
+        for item_no, record in enumerate(payload, start=1):
+            if not isinstance(record, dict):
+                raise BadRequest(f"Transaction {item_no} must be a JSON object")
+        return iter([pd.DataFrame.from_records(payload)] if payload else [])
+    raise BadRequest(f"Unsupported content type '{mimetype}'; send JSON lines, CSV or a multipart file upload")
+
+
+def score_batch(df, first_row=0):
+    """
+    Scores one frame of raw transactions. Returns (scored, skipped): scored has
+    ROW_FIELDS columns, where row is the transaction's position in the request,
+    and skipped counts the non-expense / non-INR rows left out.
+    """
+    if "Amount" not in df.columns:
+        raise BadRequest("Transactions need an 'Amount' field")
+    received = len(df)
+    df = df.assign(row=np.arange(first_row, first_row + received))
+    if "Income/Expense" in df.columns:
+        df = df[df["Income/Expense"] == "Expense"].copy()
+    df = clean_transactions(df)
+
+    note_classes, note_factors = CarbonScoringEngine.note_refinement(df["Note"])
+    factor, carbon, scores = CarbonScoringEngine.score_frame(df, note_factors=note_factors)
+    scored = pd.DataFrame({
+        "row": df["row"].to_numpy(),
+        "Category": df["Category"].astype(str).to_numpy(),
+        "Subcategory": df["Subcategory"].astype(str).to_numpy(),
+        "note_class": note_classes,
+        "Amount": df["Amount"].to_numpy(dtype=float),
+        "factor": factor,
+        "carbon_kg": carbon.round(4),
+        "eco_score": scores,
+    }, columns=ROW_FIELDS)
+    return scored, received - len(scored)
+
+
+class Rollup:
+    """Running totals and per-category rollups over the scored batches."""
+
+    def __init__(self):
+        self.skipped = 0
+        self.categories = pd.DataFrame(columns=["txn_count", "spend", "carbon_kg", "score_sum"], dtype=float)
+
+    def add(self, scored, skipped=0):
+        self.skipped += skipped
+        grouped = scored.groupby("Category", sort=False).agg(
+            txn_count=("row", "size"), spend=("Amount", "sum"),
+            carbon_kg=("carbon_kg", "sum"), score_sum=("eco_score", "sum"),
+        ).astype(float)
+        self.categories = grouped if self.categories.empty else self.categories.add(grouped, fill_value=0)
+
+    def summary(self):
+        cats = self.categories
+        txn_count = int(cats["txn_count"].sum())
+        carbon_kg = float(cats["carbon_kg"].sum())
+        avg_score = float(cats["score_sum"].sum() / txn_count) if txn_count else 100.0
+        persona, persona_message = CarbonScoringEngine.determine_persona(avg_score)
+        trees_needed, offset_cost_inr = CarbonScoringEngine.calculate_offsets(carbon_kg)
+        return {
+            "txn_count": txn_count,
+            "skipped": self.skipped,
+            "total_spend": round(float(cats["spend"].sum()), 2),
+            "carbon_kg": round(carbon_kg, 3),
+            "avg_eco_score": round(avg_score, 1),
+            "persona": persona,
+            "persona_message": persona_message,
+            "trees_needed": round(trees_needed, 2),
+            "offset_cost_inr": round(offset_cost_inr, 2),
+            "categories": {
+                category: {
+                    "txn_count": int(row.txn_count),
+                    "spend": round(row.spend, 2),
+                    "carbon_kg": round(row.carbon_kg, 3),
+                    "share": round(row.carbon_kg / carbon_kg, 4) if carbon_kg else 0.0,
+                    "avg_eco_score": round(row.score_sum / row.txn_count, 1),
+                }
+                for category, row in cats.sort_values("carbon_kg", ascending=False).iterrows()
+            },
+        }
+
+
+def error_response(message, status=400):
+    return jsonify({"error": message}), status
+
+
+@app.route("/api/calculate", methods=["POST"])
+@app.route("/api/index.py", methods=["POST"])
+def calculate():
+    include_rows = request.args.get("rows", "1").lower() not in ("0", "false", "no")
+    try:
+        batches = request_batches()
+        # Score the first batch before answering, so malformed bodies still get a 400
+        first = next(batches, None)
+        first_scored = score_batch(first) if first is not None else None
+    except BadRequest as e:
+        return error_response(str(e))
+
+    def generate():
+        rollup = Rollup()
+        scored, skipped = first_scored if first_scored else (None, 0)
+        next_row = len(first) if first is not None else 0
+        try:
+            while scored is not None:
+                rollup.add(scored, skipped)
+                if include_rows and len(scored):
+                    yield scored.to_json(orient="records", lines=True, double_precision=6).rstrip("\n") + "\n"
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                scored, skipped = score_batch(batch, next_row)
+                next_row += len(batch)
+        except Exception as e:
+            # Headers are already sent: report the failure in-band and stop, so a
+            # truncated stream is never mistaken for a complete one
+            message = str(e) if isinstance(e, BadRequest) else f"Could not score transactions: {type(e).__name__}: {e}"
+            yield json.dumps({"error": message, "row": next_row}) + "\n"
+            return
+        yield json.dumps({"summary": rollup.summary()}, ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.route("/api/calculate", methods=["GET"])
+def calculate_info():
+    return jsonify({
+        "usage": "POST transactions as JSON lines, CSV or a multipart 'file' upload",
+        "fields": ["Amount", "Category", "Subcategory", "Note", "Income/Expense", "Currency"],
+        "emission_factors": CarbonScoringEngine.EMISSION_FACTORS,
+        "subcategory_factors": CarbonScoringEngine.SUBCATEGORY_FACTORS,
+        "note_cache": {**get_classifier().stats, "hit_rate": round(get_classifier().hit_rate(), 4)},
+    })
+
+
+if __name__ == "__main__":
+    # Throughput benchmark through the WSGI stack (no network): CSV and JSON lines
+    import time
+
+    from carbon_engine import DEFAULT_TRANSACTIONS_PATH
+
+    raw = pd.read_csv(os.path.join(ROOT_DIR, DEFAULT_TRANSACTIONS_PATH))
+    big = pd.concat([raw] * 40, ignore_index=True)
+    bodies = {
+        "csv": (big.to_csv(index=False).encode(), "text/csv"),
+        "jsonl": (big.to_json(orient="records", lines=True).encode(), "application/x-ndjson"),
+    }
+    client = app.test_client()
+    for label, (body, content_type) in bodies.items():
+        for rows in ("1", "0"):
+            started = time.perf_counter()
+            response = client.post(f"/api/calculate?rows={rows}", data=io.BytesIO(body), content_type=content_type)
+            lines = response.get_data(as_text=True).splitlines()
+            elapsed = time.perf_counter() - started
+            summary = json.loads(lines[-1])["summary"]
+            print(f"{label:5s} rows={rows}: {len(big):,} txns ({len(body) / 1e6:.1f} MB) in {elapsed * 1000:7.1f} ms"
+                  f" -> {summary['txn_count'] / elapsed:10,.0f} scored/s, {len(lines) - 1:,} row lines,"
+                  f" {summary['carbon_kg']:,.1f} kg CO2e")
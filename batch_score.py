@@ -0,0 +1,279 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from carbon_engine import CarbonScoringEngine, load_transactions
+from note_classifier import get_classifier
+
+# -----------------------------------------------------------------------------
+# MULTI-USER BATCH SCORING
+# -----------------------------------------------------------------------------
+# Scores a month's worth of per-household statements in one run:
+#
+#   python batch_score.py statements/ -o scored/            # every *.csv in a directory
+#   python batch_score.py manifest.csv -o scored/ -j 8      # user_id,path per line
+#
+# Each statement is loaded and scored exactly like the dashboard does
+# (load_transactions + score_frame) in a worker process of its own; workers
+# write the scored rows themselves and only send a small rollup back, so the
+# run scales with cores instead of with pickling frames between processes.
+#
+# Outputs in the output directory:
+#   <user_id>.scored.csv   the statement's expense rows with note class, factor, carbon and eco score
+#   rollups.csv            one line per user: spend, carbon, average eco score, persona
+#   categories.csv         carbon per user and category
+#   _progress.jsonl        journal of finished users (what makes runs resumable)
+#
+# Scored files are written to a temporary name and renamed into place, and a
+# user is journalled only after that, so a crashed or interrupted run simply
+# resumes: users whose journal entry matches the input file's size and mtime
+# are skipped. --force rescores everyone.
+
+BATCH_WORKERS = int(os.environ.get("ECOPAY_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+PROGRESS_FILE = "_progress.jsonl"
+ROLLUP_FIELDS = ["user_id", "txn_count", "total_spend", "carbon_kg", "avg_eco_score", "persona",
+                 "top_category", "trees_needed", "offset_cost_inr"]
+
+
+def read_manifest(source):
+    """
+    [(user_id, path)] from a directory of CSVs (user_id = file stem) or a
+    manifest CSV with user_id,path columns (relative paths resolve against the
+    manifest's directory). Raises ValueError for duplicate user ids.
+    """
+    if os.path.isdir(source):
+        jobs = [(os.path.splitext(name)[0], os.path.join(source, name))
+                for name in sorted(os.listdir(source)) if name.lower().endswith(".csv")]
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source, newline="", encoding="utf-8") as f:
+            jobs = [(row["user_id"].strip(), os.path.join(base, row["path"].strip()))
+                    for row in csv.DictReader(f) if row.get("user_id")]
+
+    seen = set()
+    for user_id, _ in jobs:
+        if user_id in seen:
+            raise ValueError(f"Duplicate user id '{user_id}' in {source}")
+        seen.add(user_id)
+    return jobs
+
+
+def input_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+def score_user(user_id, path, out_dir):
+    """
+    Worker: scores one statement, writes <user_id>.scored.csv atomically and
+    returns the user's rollup (plus per-category carbon). Errors are returned,
+    not raised, so one bad statement doesn't stop the batch.
+    """
+    result = {"user_id": user_id, "path": path}
+    try:
+        return _score_user(result, path, out_dir)
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+        return result
+
+
+def _score_user(result, path, out_dir):
+    started = time.perf_counter()
+    result.update(input_signature(path))
+    df = load_transactions(path)
+
+    note_classes, note_factors = CarbonScoringEngine.note_refinement(df['Note'])
+    factors, carbon, eco_scores = CarbonScoringEngine.score_frame(df, note_factors=note_factors)
+    df['Note_Class'] = note_classes
+    df['Emission_Factor'] = factors
+    df['Carbon_Footprint_kg'] = carbon
+    df['Eco_Score'] = eco_scores
+
+    out_path = os.path.join(out_dir, f"{result['user_id']}.scored.csv")
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    txn_count = len(df)
+    avg_score = float(eco_scores.mean()) if txn_count else 100.0
+    total_carbon = float(carbon.sum())
+    categories = df.groupby('Category')['Carbon_Footprint_kg'].sum()
+    persona, _ = CarbonScoringEngine.determine_persona(avg_score)
+    trees_needed, offset_cost = CarbonScoringEngine.calculate_offsets(total_carbon)
+    result.update(
+        status="ok",
+        txn_count=txn_count,
+        total_spend=round(float(df['Amount'].sum()), 2),
+        carbon_kg=round(total_carbon, 3),
+        avg_eco_score=round(avg_score, 1),
+        persona=persona,
+        top_category=categories.idxmax() if txn_count else "",
+        trees_needed=round(trees_needed, 2),
+        offset_cost_inr=round(offset_cost, 2),
+        categories={k: round(float(v), 3) for k, v in categories.items()},
+        note_hit_rate=round(get_classifier().hit_rate(get_classifier().last_stats), 4),
+        seconds=round(time.perf_counter() - started, 3),
+    )
+    return result
+
+
+def load_progress(out_dir):
+    """Latest journal entry per user id (a torn last line from a crash is ignored)."""
+    done = {}
+    path = os.path.join(out_dir, PROGRESS_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                done[entry["user_id"]] = entry
+    return done
+
+
+def is_done(entry, path, out_dir):
+    if entry is None or entry.get("status") != "ok":
+        return False
+    try:
+        signature = input_signature(path)
+    except OSError:
+        return False  # missing input: let the worker report it
+    return (
+        {"size": entry.get("size"), "mtime": entry.get("mtime")} == signature
+        and os.path.exists(os.path.join(out_dir, f"{entry['user_id']}.scored.csv"))
+    )
+
+
+def write_rollups(out_dir, entries):
+    """Rewrites rollups.csv and categories.csv from the journalled results."""
+    ok = sorted((e for e in entries if e.get("status") == "ok"), key=lambda e: e["user_id"])
+    with open(os.path.join(out_dir, "rollups.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=ROLLUP_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(ok)
+    with open(os.path.join(out_dir, "categories.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user_id", "Category", "carbon_kg"])
+        for entry in ok:
+            writer.writerows((entry["user_id"], cat, kg) for cat, kg in entry["categories"].items())
+    return ok
+
+
+def run_batch(jobs, out_dir, workers=BATCH_WORKERS, force=False, log=print):
+    """
+    Scores every (user_id, path) job not already done, `workers` at a time, and
+    rebuilds the rollups. Returns {"scored", "skipped", "failed", "rows", "seconds"}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    done = {} if force else load_progress(out_dir)
+    pending = [(u, p) for u, p in jobs if not is_done(done.get(u), p, out_dir)]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        log(f"Resuming: {skipped} of {len(jobs)} users already scored")
+
+    started = time.perf_counter()
+    rows = failed = 0
+    with open(os.path.join(out_dir, PROGRESS_FILE), "w" if force else "a", encoding="utf-8") as journal, \
+            ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(score_user, u, p, out_dir): (u, p) for u, p in pending}
+        for finished, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. BrokenProcessPool): journal it as a failure
+                user_id, path = futures[future]
+                result = {"user_id": user_id, "path": path, "status": "error", "error": f"{type(e).__name__}: {e}"}
+            journal.write(json.dumps(result, ensure_ascii=False) + "\n")
+            journal.flush()
+            done[result["user_id"]] = result
+
+            elapsed = time.perf_counter() - started
+            eta = elapsed / finished * (len(pending) - finished)
+            if result["status"] == "ok":
+                rows += result["txn_count"]
+                detail = f"{result['txn_count']:,} txns, {result['carbon_kg']:,.1f} kg CO2e"
+            else:
+                failed += 1
+                detail = f"FAILED ({result['error']})"
+            log(f"[{finished}/{len(pending)}] {result['user_id']}: {detail} | "
+                f"{rows / elapsed if elapsed else 0:,.0f} txns/s, ETA {eta:.0f}s")
+
+    job_ids = {u for u, _ in jobs}
+    write_rollups(out_dir, [e for u, e in done.items() if u in job_ids])
+    return {"scored": len(pending) - failed, "skipped": skipped, "failed": failed, "rows": rows,
+            "seconds": round(time.perf_counter() - started, 2)}
+
+
+def benchmark(users, rows_per_user, worker_counts):
+    """Synthetic statements (copies of the sample CSV) scored with each worker count."""
+    import shutil
+    import tempfile
+
+    import pandas as pd
+
+    from carbon_engine import DEFAULT_TRANSACTIONS_PATH
+
+    sample = pd.read_csv(DEFAULT_TRANSACTIONS_PATH)
+    statement = pd.concat([sample] * max(1, rows_per_user // len(sample)), ignore_index=True)
+    root = tempfile.mkdtemp(prefix="ecopay_batch_")
+    try:
+        source = os.path.join(root, "statements")
+        os.makedirs(source)
+        for i in range(users):
+            statement.to_csv(os.path.join(source, f"user_{i:04d}.csv"), index=False)
+        jobs = read_manifest(source)
+
+        baseline = None
+        for workers in worker_counts:
+            stats = run_batch(jobs, os.path.join(root, f"out_{workers}"), workers=workers, log=lambda _: None)
+            baseline = baseline or stats["seconds"]
+            print(f"{workers:2d} workers: {users} users x {len(statement):,} rows in {stats['seconds']:6.2f}s "
+                  f"({stats['rows'] / stats['seconds']:9,.0f} txns/s, speedup {baseline / stats['seconds']:.2f}x)")
+        resumed = run_batch(jobs, os.path.join(root, f"out_{worker_counts[-1]}"), log=lambda _: None)
+        print(f"Re-run on finished output: {resumed['skipped']} users skipped in {resumed['seconds']:.2f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score many households' transaction statements in parallel.")
+    parser.add_argument("source", nargs="?", help="directory of per-user CSVs, or a manifest CSV (user_id,path)")
+    parser.add_argument("-o", "--out", default="scored", help="output directory (default: scored)")
+    parser.add_argument("-j", "--workers", type=int, default=BATCH_WORKERS, help=f"worker processes (default: {BATCH_WORKERS})")
+    parser.add_argument("--force", action="store_true", help="rescore users that are already done")
+    parser.add_argument("--benchmark", type=int, metavar="USERS", help="time synthetic users at 1, 2, 4... workers instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        counts = sorted({1, *[2 ** k for k in range(1, 6) if 2 ** k <= args.workers], args.workers})
+        benchmark(args.benchmark, 20000, counts)
+        return 0
+    if not args.source:
+        parser.error("source is required (or use --benchmark)")
+
+    try:
+        jobs = read_manifest(args.source)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Could not read {args.source}: {e}", file=sys.stderr)
+        return 2
+    if not jobs:
+        print(f"No statements found in {args.source}", file=sys.stderr)
+        return 2
+
+    stats = run_batch(jobs, args.out, workers=args.workers, force=args.force)
+    print(f"Done: {stats['scored']} scored, {stats['skipped']} skipped, {stats['failed']} failed, "
+          f"{stats['rows']:,} txns in {stats['seconds']}s -> {os.path.join(args.out, 'rollups.csv')}")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
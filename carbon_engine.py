@@ -0,0 +1,273 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from note_classifier import get_classifier
+
+# -----------------------------------------------------------------------------
+# CARBON SCORING ENGINE
+# -----------------------------------------------------------------------------
+# Category-aware emission factors (kg CO2e per ₹ spent), eco scores and offset
+# maths shared by the Streamlit modules. The per-row methods are kept for
+# explanations and single transactions; the vectorized ones score whole
+# transaction frames at once, and also refine the factor from the Note column
+# (merchant / item keywords, see note_classifier.py) where one matches.
+
+DEFAULT_TRANSACTIONS_PATH = "Daily Household Transactions.csv"
+
+
+def load_transactions(path=DEFAULT_TRANSACTIONS_PATH):
+    """
+    Expense transactions in INR from a household transactions CSV, with Date
+    parsed, Amount numeric and missing Category/Subcategory/Note filled.
+    Raises FileNotFoundError if the file doesn't exist.
+    """
+    df = pd.read_csv(path)
+
+    df['Date'] = pd.to_datetime(df['Date'], dayfirst=True, errors='coerce')
+    df = df[df['Income/Expense'] == 'Expense'].copy()
+    return clean_transactions(df)
+
+
+def clean_transactions(df):
+    """
+    The column clean-up of load_transactions for an already-parsed frame: INR
+    only (when a Currency column exists), Amount numeric, Category/Subcategory/Note
+    filled. Missing Category/Subcategory/Note columns are added as defaults.
+    Raises KeyError if there is no Amount column.
+    """
+    if 'Currency' in df.columns:
+        df = df[df['Currency'] == 'INR'].copy()
+    # Exported amounts may carry thousands separators
+    if not pd.api.types.is_numeric_dtype(df['Amount']):
+        df['Amount'] = pd.to_numeric(df['Amount'].astype(str).str.replace(',', '', regex=False), errors='coerce')
+    df['Amount'] = df['Amount'].fillna(0)
+
+    # Fill NA for smooth plotting
+    for column, default in (('Category', 'Other'), ('Subcategory', 'General'), ('Note', '')):
+        df[column] = df[column].fillna(default) if column in df.columns else default
+    return df
+
+
+class CarbonScoringEngine:
+    EMISSION_FACTORS = {
+        'Transportation': 0.15, 'Food': 0.06, 'Utilities': 0.20,
+        'Household': 0.08, 'Apparel': 0.10, 'Education': 0.01,
+        'Health': 0.03, 'Personal Development': 0.01, 'Festivals': 0.05,
+        'subscription': 0.005, 'Other': 0.05
+    }
+    
+    SUBCATEGORY_FACTORS = {
+        'Train': 0.04, 'Air': 0.25, 'auto': 0.12,
+        'Vegetables': 0.03, 'Meat': 0.15,
+    }
+    
+    RECOMMENDATIONS = {
+        'Transportation': [
+            "🚗 **Carpooling**: Reduces individual footprint by ~40% for daily commutes.",
+            "🚲 **Active Transport**: Consider cycling for trips under 5km; it's zero emission!",
+            "🚆 **Rail over Road**: Trains are 80% less carbon-intensive than solo driving.",
+            "🔋 **EV Switch**: Transitioning to an Electric Vehicle can cut lifetime emissions by 50%."
+        ],
+        'Food': [
+            "🥩 **Meat Reduction**: Reducing meat consumption by just one day a week saves ~4kg CO2.",
+            "🌾 **Local Sourcing**: Buy local seasonal produce to cut down on 'food miles'.",
+            "🥡 **Waste Not**: Meal prepping reduces food waste, a major methane source."
+        ],
+        'Utilities': [
+            "💡 **LED Switch**: Switch to LED bulbs to cut lighting energy by 75%.",
+            "🔌 **Vampire Power**: Unplug chargers and standby TVs to save 10% on bills.",
+            "🌡️ **Smart Climate**: Adjusting AC by 1°C can save 6% electricity."
+        ],
+        'Apparel': [
+            "👕 **Fast Fashion**: Buying one used item instead of new reduces its carbon footprint by 82%.",
+            "🧶 **Material Choice**: Choose natural fibers like organic cotton or linen over polyester."
+        ]
+    }
+
+    @staticmethod
+    def calculate_footprint(row):
+        category = row.get('Category', 'Other')
+        subcategory = row.get('Subcategory', '')
+        amount = row.get('Amount', 0)
+        
+        factor = CarbonScoringEngine.EMISSION_FACTORS.get(category, 0.05)
+        
+        if subcategory in CarbonScoringEngine.SUBCATEGORY_FACTORS:
+            factor = CarbonScoringEngine.SUBCATEGORY_FACTORS[subcategory]
+        elif isinstance(subcategory, str) and 'Meat' in subcategory:
+            factor = 0.12 
+            
+        carbon_mass = amount * factor
+        return factor, carbon_mass
+
+    @staticmethod
+    def generate_explanation(row, factor, carbon_mass):
+        category = row['Category']
+        intensity_label = "Low"
+        if factor > 0.12: intensity_label = "High"
+        elif factor > 0.05: intensity_label = "Moderate"
+        
+        explanation = f"**{intensity_label} Intensity** ({factor} kg/₹). "
+        if intensity_label == "High":
+            explanation += f"Driven by high-emission activity in *{category}*."
+        else:
+            explanation += f"Efficient spending in *{category}*."
+        return explanation
+
+    @staticmethod
+    def generate_explanations(categories, factors):
+        """
+        generate_explanation for whole columns: the text depends only on the
+        (category, factor) pair, so it is built once per distinct pair and
+        broadcast back to the rows.
+        """
+        pairs = pd.MultiIndex.from_arrays([np.asarray(categories, dtype=object), np.asarray(factors, dtype=float)])
+        codes, uniques = pd.factorize(pairs)
+        texts = np.array([
+            CarbonScoringEngine.generate_explanation({'Category': category}, factor, None)
+            for category, factor in uniques
+        ], dtype=object)
+        return texts[codes]
+
+    @staticmethod
+    def calculate_eco_score(carbon_mass, amount):
+        if amount == 0: return 100
+        intensity = carbon_mass / amount
+        score = max(0, 100 - (intensity * 400)) 
+        return int(score)
+
+    @staticmethod
+    def determine_persona(avg_score):
+        if avg_score >= 80: return "🌱 Eco-Warrior", "You are leading the charge for a greener planet!"
+        elif avg_score >= 60: return "🌿 Conconscious Citizen", "You are making good choices, but there's room to grow."
+        elif avg_score >= 40: return "🏭 Carbon Neutral Aspirant", "Your footprint is visible. Let's optimize your habits."
+        else: return "⚠️ High Emitter", "Your activities have a significant impact. Action needed."
+        
+    @staticmethod
+    def get_prescriptive_advice(category):
+        return CarbonScoringEngine.RECOMMENDATIONS.get(category, ["🌱 Review this expense for sustainable alternatives.", "♻️ Consider the lifecycle impact of this purchase."])
+
+    @staticmethod
+    def calculate_offsets(total_carbon_kg):
+        trees_needed = total_carbon_kg / 21
+        cost_usd = (total_carbon_kg / 1000) * 12 
+        cost_inr = cost_usd * 84 
+        return trees_needed, cost_inr
+
+    # --- Vectorized scoring (whole columns at once) ----------------------------
+
+    @staticmethod
+    def emission_factors(categories, subcategories):
+        """
+        Same rules as calculate_footprint, evaluated for whole columns: the
+        category factor, overridden by a known subcategory, else 0.12 for any
+        other subcategory mentioning 'Meat'. Each distinct value is looked up
+        once and broadcast back through its factorized codes.
+        """
+        cat_codes, cat_values = pd.factorize(np.asarray(categories, dtype=object), use_na_sentinel=False)
+        cat_factors = np.array([CarbonScoringEngine.EMISSION_FACTORS.get(c, 0.05) for c in cat_values], dtype=float)
+
+        sub_codes, sub_values = pd.factorize(np.asarray(subcategories, dtype=object), use_na_sentinel=False)
+        sub_overrides = np.full(len(sub_values), np.nan)
+        for i, sub in enumerate(sub_values):
+            if sub in CarbonScoringEngine.SUBCATEGORY_FACTORS:
+                sub_overrides[i] = CarbonScoringEngine.SUBCATEGORY_FACTORS[sub]
+            elif isinstance(sub, str) and 'Meat' in sub:
+                sub_overrides[i] = 0.12
+
+        overrides = sub_overrides[sub_codes]
+        return np.where(np.isnan(overrides), cat_factors[cat_codes], overrides)
+
+    @staticmethod
+    def calculate_eco_scores(carbon_mass, amount):
+        """Vectorized calculate_eco_score."""
+        carbon_mass = np.asarray(carbon_mass, dtype=float)
+        amount = np.asarray(amount, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = np.maximum(0, 100 - (carbon_mass / amount * 400))
+        return np.where(amount == 0, 100, np.trunc(score)).astype(int)
+
+    @staticmethod
+    def note_refinement(notes):
+        """
+        (classes, factors) from the transaction notes: the refined subcategory
+        and emission factor of each note's keyword rule (None / NaN where no rule matches).
+        """
+        return get_classifier().refine(np.asarray(notes, dtype=object))
+
+    @staticmethod
+    def score_frame(df, refine_notes=True, note_factors=None):
+        """
+        Emission factor, carbon mass and eco score for every row of a transactions
+        frame (Category, Subcategory, Amount columns) as arrays, in row order.
+
+        With refine_notes, a factor from the Note column (when the frame has one)
+        overrides the category/subcategory factor wherever a note rule matched;
+        pass note_factors (from note_refinement) if they were already computed.
+        """
+        amount = pd.to_numeric(df['Amount'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        factor = CarbonScoringEngine.emission_factors(df['Category'], df['Subcategory'])
+        if refine_notes and note_factors is None and 'Note' in df.columns:
+            _, note_factors = CarbonScoringEngine.note_refinement(df['Note'])
+        if refine_notes and note_factors is not None:
+            factor = np.where(np.isnan(note_factors), factor, note_factors)
+        carbon = amount * factor
+        return factor, carbon, CarbonScoringEngine.calculate_eco_scores(carbon, amount)
+
+
+def footprint_summary(path=DEFAULT_TRANSACTIONS_PATH):
+    """
+    Baseline footprint of a transactions CSV, scored with the category-aware factors.
+
+    Returns a dict with 'status' ('ok', 'missing_file', 'invalid_data' or 'error'),
+    'message', and 'carbon_kg', 'total_spend', 'txn_count' (zeros unless status is 'ok').
+    """
+    result = {"status": "ok", "message": "", "carbon_kg": 0.0, "total_spend": 0.0, "txn_count": 0}
+    if not os.path.exists(path):
+        result.update(status="missing_file", message=f"Transactions file '{path}' not found.")
+        return result
+    try:
+        df = load_transactions(path)
+    except (KeyError, ValueError, pd.errors.ParserError) as e:
+        result.update(status="invalid_data", message=f"Could not read transactions from '{path}': {e}")
+        return result
+    except Exception as e:
+        result.update(status="error", message=f"Unexpected error loading '{path}': {e}")
+        return result
+
+    _, carbon, _ = CarbonScoringEngine.score_frame(df)
+    result.update(
+        carbon_kg=float(carbon.sum()),
+        total_spend=float(df['Amount'].sum()),
+        txn_count=int(len(df)),
+    )
+    return result
+
+
+if __name__ == "__main__":
+    # Benchmark: row-wise apply (as the dashboard used to do) vs the vectorized path
+    import time
+
+    df = load_transactions()
+    big = pd.concat([df] * 50, ignore_index=True)
+
+    started = time.perf_counter()
+    rowwise = big.apply(lambda r: CarbonScoringEngine.calculate_footprint(r), axis=1, result_type='expand')
+    rowwise_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    factor, carbon, scores = CarbonScoringEngine.score_frame(big, refine_notes=False)
+    vector_s = time.perf_counter() - started
+
+    assert np.allclose(rowwise[1].to_numpy(dtype=float), carbon)
+    print(f"Rows scored:     {len(big):,}")
+    print(f"Row-wise apply:  {rowwise_s * 1000:8.1f} ms")
+    print(f"Vectorized:      {vector_s * 1000:8.1f} ms")
+
+    started = time.perf_counter()
+    refined = CarbonScoringEngine.score_frame(big)[1]
+    print(f"With note rules: {(time.perf_counter() - started) * 1000:8.1f} ms "
+          f"({refined.sum() / carbon.sum() - 1:+.1%} carbon vs category factors)")
+    print(f"Baseline (CSV):  {footprint_summary()}")
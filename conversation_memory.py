@@ -0,0 +1,138 @@
+import math
+import os
+import re
+
+# -----------------------------------------------------------------------------
+# TOKEN-BUDGETED CONVERSATION MEMORY
+# -----------------------------------------------------------------------------
+# Chat history sent to the LLM is kept to a fixed size: the most recent turns go
+# verbatim, and everything older is folded (once, incrementally) into a short
+# structured summary of what the assistant asked and what the user answered.
+# The summary plus the recent turns always fit in the token budget, so the
+# prompt stays flat no matter how long the conversation runs.
+
+HISTORY_TOKEN_BUDGET = int(os.environ.get("ECOPAY_CHAT_TOKEN_BUDGET", "1200"))
+RECENT_MESSAGES = int(os.environ.get("ECOPAY_CHAT_RECENT_MESSAGES", "4"))
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators
+MAX_QUESTION_CHARS = 120
+MAX_ANSWER_CHARS = 200
+SUMMARY_BUDGET_SHARE = 0.4  # the summary may use at most this share of the budget
+COMPACT_ANSWER_CHARS = 60  # answers in compacted (older) entries
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate: ~4 UTF-8 bytes per token. Latin text is ~4 chars per
+    token, and Indic scripts (3 bytes per char) come out near a token per char
+    or two, which is close to how they actually tokenize.
+    """
+    return math.ceil(len(text.encode("utf-8")) / 4)
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _clip(text, limit):
+    text = re.sub(r"\s+", " ", text.replace("*", "").replace("#", "")).strip()
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def _last_question(text):
+    """The question an assistant message ends with (or its last sentence)."""
+    sentences = [s for s in re.split(r"(?<=[.!?।])\s+", text.strip()) if s]
+    questions = [s for s in sentences if s.rstrip().endswith("?")]
+    return (questions or sentences or [""])[-1]
+
+
+class ConversationMemory:
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET, recent_messages=RECENT_MESSAGES):
+        self.token_budget = token_budget
+        self.recent_messages = recent_messages
+        # Folded turns, oldest first: {"asked": ..., "answer": ...}
+        self.entries = []
+        # Extra structured facts (e.g. extracted profile answers) shown in the summary
+        self.facts = {}
+        self.folded = 0  # messages[:folded] are represented by the summary
+
+    def _fold(self, messages, upto):
+        """Folds messages[self.folded:upto] into the summary entries."""
+        for i in range(self.folded, upto):
+            message = messages[i]
+            if message["role"] != "user":
+                continue
+            previous = messages[i - 1] if i > 0 and messages[i - 1]["role"] == "assistant" else None
+            self.entries.append({
+                "asked": _clip(_last_question(previous["content"]), MAX_QUESTION_CHARS) if previous else "",
+                "answer": _clip(message["content"], MAX_ANSWER_CHARS),
+            })
+        self.folded = max(self.folded, upto)
+
+    def _compact_oldest(self):
+        for entry in self.entries:
+            if not entry.get("compact"):
+                entry.update(asked="", answer=_clip(entry["answer"], COMPACT_ANSWER_CHARS), compact=True)
+                return
+        self.entries.pop(0)
+
+    def summary(self):
+        """Summary message for everything folded so far (None if nothing is)."""
+        if not self.entries and not self.facts:
+            return None
+        lines = ["Summary of the earlier conversation (oldest first):"]
+        for entry in self.entries:
+            lines.append(f"- Q: {entry['asked']} -> A: {entry['answer']}" if entry["asked"] else f"- User: {entry['answer']}")
+        if self.facts:
+            lines.append("Collected so far: " + "; ".join(f"{k}: {v}" for k, v in self.facts.items()))
+        return {"role": "system", "content": "\n".join(lines)}
+
+    def _tokens(self, summary, recent):
+        total = sum(message_tokens(m) for m in recent)
+        return total + (message_tokens(summary) if summary else 0)
+
+    def build(self, messages):
+        """
+        History to send for `messages` (the full transcript): an optional summary
+        message followed by the most recent turns verbatim, within the token budget.
+        """
+        self._fold(messages, max(0, len(messages) - self.recent_messages))
+        start = self.folded
+        summary = self.summary()
+
+        # Fold more recent turns while over budget, always keeping the latest message
+        while start < len(messages) - 1 and self._tokens(summary, messages[start:]) > self.token_budget:
+            start += 1
+            self._fold(messages, start)
+            summary = self.summary()
+
+        # Keep the summary to its share of the budget (and the whole prompt within it):
+        # older entries lose their question and are clipped first, then dropped
+        summary_limit = self.token_budget * SUMMARY_BUDGET_SHARE
+        while self.entries and (
+            message_tokens(summary) > summary_limit or self._tokens(summary, messages[start:]) > self.token_budget
+        ):
+            self._compact_oldest()
+            summary = self.summary()
+
+        recent = [{"role": m["role"], "content": m["content"]} for m in messages[start:]]
+        return ([summary] if summary else []) + recent
+
+    def prompt_tokens(self, messages):
+        """Estimated tokens of what build() would send."""
+        return sum(message_tokens(m) for m in self.build(messages))
+
+
+if __name__ == "__main__":
+    # Prompt size per turn: full history vs the budgeted memory over a long chat
+    memory = ConversationMemory()
+    reply = (
+        "Thank you, that is really helpful. Commuting by metro is one of the lowest-carbon ways to travel in "
+        "an Indian city, and it already puts you ahead of most car commuters. I have noted it down. "
+    ) * 3
+    transcript = [{"role": "assistant", "content": "Hello! In which language would you like to proceed?"}]
+    for turn in range(1, 21):
+        transcript.append({"role": "user", "content": f"My answer to question {turn}: I usually take the metro to work, around 15 km each way, five days a week."})
+        full = sum(message_tokens(m) for m in transcript)
+        print(f"turn {turn:2d}: full history {full:5d} tokens, memory {memory.prompt_tokens(transcript):5d} tokens")
+        transcript.append({"role": "assistant", "content": reply + f"Question {turn + 1}: how often do you fly in a typical year?"})
@@ -0,0 +1,123 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------------------------------------------------------
+# LOCAL IMAGE PIPELINE FOR PROJECT CARDS
+# -----------------------------------------------------------------------------
+# Remote images are downloaded once, cropped to the card's thumbnail size and
+# stored as compact WebP files in a disk cache keyed by a hash of the source URL.
+# Cards embed the thumbnail inline (a data URI), so once the cache is warm the
+# card grid never waits on a third-party CDN. When an image can't be fetched
+# (offline, CDN down) the bundled placeholder is used instead.
+
+IMAGE_CACHE_DIR = os.environ.get(
+    "ECOPAY_IMAGE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".image_cache")
+)
+PLACEHOLDER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "project-placeholder.svg")
+
+# Cards show images 160px tall at full column width; 2x for high-DPI screens
+THUMBNAIL_SIZE = (480, 320)
+THUMBNAIL_QUALITY = 70
+FETCH_TIMEOUT = float(os.environ.get("ECOPAY_IMAGE_TIMEOUT", "6"))
+PREFETCH_WORKERS = 4
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def cache_path(url, size=THUMBNAIL_SIZE):
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(IMAGE_CACHE_DIR, f"{digest}-{size[0]}x{size[1]}.webp")
+
+
+def fetch_image(url, timeout=FETCH_TIMEOUT):
+    """Raw bytes of a remote image."""
+    request = urllib.request.Request(url, headers={"User-Agent": "Ecopay-ImageCache/1.0"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """Center-crops and resizes image bytes to `size`, returned as WebP bytes."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as img:
+        thumb = ImageOps.fit(img.convert("RGB"), size, method=Image.LANCZOS)
+    out = io.BytesIO()
+    thumb.save(out, format="WEBP", quality=quality, method=4)
+    return out.getvalue()
+
+
+def thumbnail(url, size=THUMBNAIL_SIZE, download=True):
+    """
+    Cached WebP thumbnail bytes for `url`, downloading and resizing on a cache
+    miss. Returns None if the image can't be fetched or decoded, or on a miss
+    when download is False (the disk check alone never blocks on the network).
+    """
+    path = cache_path(url, size)
+    if not download:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+    # One download per URL even when several sessions ask for it at once
+    with _lock_for(path):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        try:
+            data = make_thumbnail(fetch_image(url), size)
+        except Exception as e:
+            print(f"⚠️ Could not cache image {url}: {e}")
+            return None
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data
+
+
+def placeholder_data_uri():
+    with open(PLACEHOLDER_PATH, "rb") as f:
+        return to_data_uri(f.read(), "image/svg+xml")
+
+
+def to_data_uri(data, mime):
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def thumbnail_data_uri(url, size=THUMBNAIL_SIZE, download=True):
+    """Inline thumbnail for an <img> tag, or the bundled placeholder if unavailable."""
+    data = thumbnail(url, size, download=download)
+    if data is None:
+        return placeholder_data_uri()
+    return to_data_uri(data, "image/webp")
+
+
+def prefetch(urls, size=THUMBNAIL_SIZE, workers=PREFETCH_WORKERS):
+    """Warms the disk cache for every URL in parallel; returns how many are cached."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda url: thumbnail(url, size), urls))
+    return sum(r is not None for r in results)
+
+
+if __name__ == "__main__":
+    # Warm the cache from the command line: python image_cache.py URL [URL ...]
+    import sys
+    import time
+
+    started = time.perf_counter()
+    cached = prefetch(sys.argv[1:])
+    print(f"Cached {cached}/{len(sys.argv) - 1} images in {time.perf_counter() - started:.2f}s -> {IMAGE_CACHE_DIR}")
@@ -6,8 +6,15 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException
+import asyncio
+import datetime
+import json
 import os
+import queue
+import threading
 import time
+import urllib.error
+import urllib.request
 
 # --- CONFIGURATION ---
 # Add your Streamlit app URLs here in the list
@@ -19,6 +26,25 @@ DEFAULT_URLS = [
     "https://hyperops-telligqtw4eklqwcmbs6nx.streamlit.app/"
 ]
 
+# Streamlit Cloud proxies the app server under "/~/+/"; its health endpoint only
+# answers "ok" while the app is actually running, so a sleeping app fails this probe.
+HEALTH_PATH = os.environ.get("STREAMLIT_HEALTH_PATH", "/~/+/_stcore/health")
+PROBE_TIMEOUT = float(os.environ.get("PROBE_TIMEOUT", "10"))
+MAX_CONCURRENT_PROBES = int(os.environ.get("MAX_CONCURRENT_PROBES", "8"))
+WAKE_BUTTON_TEXT = "Yes, get this app back up"
+
+# Browser pool used for apps that fail the health probe
+BROWSER_WORKERS = int(os.environ.get("BROWSER_WORKERS", "2"))
+PAGE_LOAD_TIMEOUT = int(os.environ.get("PAGE_LOAD_TIMEOUT", "30"))  # seconds per navigation
+BUTTON_WAIT_TIMEOUT = int(os.environ.get("BUTTON_WAIT_TIMEOUT", "15"))  # seconds per wait step
+WAKE_TIME_BUDGET = float(os.environ.get("WAKE_TIME_BUDGET", "180"))  # seconds for the whole pool
+
+# Timing report: JSON lines go to this file (appended) or to stdout if unset,
+# and a Prometheus text-format snapshot is written only when a path is given.
+METRICS_JSONL_PATH = os.environ.get("WAKE_METRICS_JSONL")
+METRICS_PROM_PATH = os.environ.get("WAKE_METRICS_PROM")
+TIMING_PHASES = ["probe", "navigation", "button_detect", "wake", "total"]
+
 def get_urls():
     """
     Retrieves URLs from environment variable 'STREAMLIT_APP_URLS' (comma-separated)
@@ -30,41 +56,309 @@ def get_urls():
         return [url.strip() for url in env_urls.split(",") if url.strip()]
     return DEFAULT_URLS
 
-def wake_up_app(driver, url):
+def probe_app(url, timeout=PROBE_TIMEOUT):
+    """
+    Checks a single app over plain HTTP (no browser).
+    Returns 'awake' if the health endpoint answers "ok", 'asleep' if the app
+    responded with anything else, or 'error' if it could not be reached at all.
+    """
+    health_url = url.rstrip("/") + HEALTH_PATH
+    request = urllib.request.Request(health_url, headers={"User-Agent": "Ecopay-KeepAlive/1.0"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read(4096).decode("utf-8", errors="ignore")
+            if response.status == 200 and body.strip().lower() == "ok":
+                return "awake"
+            return "asleep"
+    except urllib.error.HTTPError:
+        # 4xx/5xx from the Streamlit proxy means the app server is not running
+        return "asleep"
+    except Exception as e:
+        print(f"  -> Probe failed for {url}: {e}")
+        return "error"
+
+async def probe_all(urls, max_concurrency=MAX_CONCURRENT_PROBES, timings=None):
+    """
+    Probes every URL concurrently, with at most `max_concurrency` requests in flight.
+    Returns a dict of url -> status, so total time is roughly that of the slowest app.
+    If `timings` is given, each probe's duration is stored in it as url -> seconds.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _probe(url):
+        async with semaphore:
+            started = time.perf_counter()
+            status = await asyncio.to_thread(probe_app, url)
+            if timings is not None:
+                timings[url] = time.perf_counter() - started
+            return url, status
+
+    results = await asyncio.gather(*(_probe(url) for url in urls))
+    return dict(results)
+
+def create_driver():
+    """Starts a headless Chrome session for apps that need the wake-up button clicked."""
+    options = Options()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+def wake_up_app(driver, url, wait_timeout=BUTTON_WAIT_TIMEOUT, timings=None):
     """
     Visits a single URL and attempts to click the wake-up button.
+    Returns 'awake', 'woken', 'unconfirmed' or 'error'. Output is buffered and
+    printed as one block so parallel workers don't interleave their lines.
+    Phase durations in seconds (navigation, button_detect, wake, total) are
+    written into `timings` if a dict is passed.
     """
-    print(f"--------------------------------------------------")
-    print(f"Checking: {url}")
+    log = ["--------------------------------------------------", f"Checking: {url}"]
+    button_xpath = f"//button[contains(text(),'{WAKE_BUTTON_TEXT}')]"
+    status = "error"
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
     
     try:
         driver.get(url)
+        timings["navigation"] = time.perf_counter() - started
         
         # specific wait for this page
-        wait = WebDriverWait(driver, 15)
+        wait = WebDriverWait(driver, wait_timeout)
 
         try:
             # Look for the wake-up button
             # Note: The text might vary slightly, but 'Yes, get this app back up' is standard.
-            button = wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(),'Yes, get this app back up')]"))
-            )
-            print("  -> Wake-up button found. Clicking...")
+            detect_started = time.perf_counter()
+            try:
+                button = wait.until(
+                    EC.element_to_be_clickable((By.XPATH, button_xpath))
+                )
+            finally:
+                timings["button_detect"] = time.perf_counter() - detect_started
+            log.append("  -> Wake-up button found. Clicking...")
             button.click()
 
             # After clicking, check if it disappears (confirmation action was registered)
+            wake_started = time.perf_counter()
             try:
-                wait.until(EC.invisibility_of_element_located((By.XPATH, "//button[contains(text(),'Yes, get this app back up')]")))
-                print("  -> Button clicked and disappeared ✅ (app should be waking up)")
+                wait.until(EC.invisibility_of_element_located((By.XPATH, button_xpath)))
+                timings["wake"] = time.perf_counter() - wake_started
+                log.append("  -> Button clicked and disappeared ✅ (app should be waking up)")
+                status = "woken"
             except TimeoutException:
-                print("  -> Button was clicked but did NOT disappear ⚠️ (might need manual check)")
+                log.append("  -> Button was clicked but did NOT disappear ⚠️ (might need manual check)")
+                status = "unconfirmed"
 
         except TimeoutException:
             # No button at all → app is assumed to be awake
-            print("  -> No wake-up button found. Assuming app is already awake ✅")
+            log.append("  -> No wake-up button found. Assuming app is already awake ✅")
+            status = "awake"
 
     except Exception as e:
-        print(f"  -> Error processing {url}: {e}")
+        log.append(f"  -> Error processing {url}: {e}")
+
+    timings["total"] = time.perf_counter() - started
+    print("\n".join(log))
+    return status
+
+def _quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+def browser_worker(worker_id, url_queue, results, deadline, active_drivers, driver_factory=create_driver, timings=None,
+                   lock=None):
+    """
+    Pulls URLs off the shared queue until it is empty or the time budget runs out.
+    Each worker owns its own browser; after an error the session is discarded so a
+    hung or crashed page cannot poison the next URL. Writes to `results` and
+    `timings` are made under `lock`, since wake_apps snapshots them while a
+    worker that blew the budget may still finish.
+    """
+    lock = lock or threading.Lock()
+    driver = None
+    try:
+        while True:
+            try:
+                url = url_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            if time.monotonic() >= deadline:
+                print(f"[worker {worker_id}] Time budget exhausted, skipping {url}")
+                with lock:
+                    results[url] = "skipped"
+                continue
+
+            if driver is None:
+                try:
+                    driver = driver_factory()
+                    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+                    active_drivers[worker_id] = driver
+                except Exception as e:
+                    print(f"[worker {worker_id}] Failed to initialize WebDriver: {e}")
+                    with lock:
+                        results[url] = "error"
+                    driver = None
+                    continue
+
+            url_timings = {}
+            status = wake_up_app(driver, url, timings=url_timings)
+            with lock:
+                results[url] = status
+                if timings is not None:
+                    timings[url] = url_timings
+
+            if status == "error":
+                active_drivers.pop(worker_id, None)
+                _quit_driver(driver)
+                driver = None
+    finally:
+        if driver:
+            active_drivers.pop(worker_id, None)
+            _quit_driver(driver)
+
+def wake_apps(urls, workers=BROWSER_WORKERS, time_budget=WAKE_TIME_BUDGET, driver_factory=create_driver, timings=None):
+    """
+    Wakes `urls` with a pool of independent browser workers and returns url -> status.
+    The whole pool is bounded by `time_budget` seconds; URLs still in flight when it
+    expires are reported as 'timeout' and their browsers are force-closed.
+    `driver_factory` can be swapped to point the pool at local stub pages in tests.
+    Per-URL phase timings from wake_up_app are collected into `timings` if given.
+    Both are snapshots taken when the budget expires: a straggling worker that
+    finishes later doesn't change them.
+    """
+    url_queue = queue.Queue()
+    for url in urls:
+        url_queue.put(url)
+
+    results = {}
+    pool_timings = {}
+    lock = threading.Lock()
+    active_drivers = {}
+    deadline = time.monotonic() + time_budget
+    pool_size = max(1, min(workers, len(urls)))
+
+    threads = [
+        threading.Thread(
+            target=browser_worker,
+            args=(worker_id, url_queue, results, deadline, active_drivers, driver_factory, pool_timings, lock),
+            daemon=True,
+        )
+        for worker_id in range(pool_size)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=max(0, deadline - time.monotonic()))
+
+    # Anything a worker is still stuck on has blown the budget
+    for worker_id, driver in list(active_drivers.items()):
+        _quit_driver(driver)
+    with lock:
+        snapshot = {url: results.get(url, "timeout") for url in urls}
+        if timings is not None:
+            timings.update(pool_timings)
+    return snapshot
+
+# -----------------------------------------------------------------------------
+# TIMING REPORT & METRICS EXPORT
+# -----------------------------------------------------------------------------
+
+def build_report(urls, probe_statuses, probe_timings, wake_results=None, wake_timings=None):
+    """Merges probe and browser results into one flat record per URL."""
+    wake_results = wake_results or {}
+    wake_timings = wake_timings or {}
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    records = []
+    for url in urls:
+        phases = dict(wake_timings.get(url, {}))
+        if url in probe_timings:
+            phases["probe"] = probe_timings[url]
+        records.append({
+            "timestamp": timestamp,
+            "url": url,
+            "probe_status": probe_statuses.get(url),
+            "wake_status": wake_results.get(url),
+            **{f"{phase}_s": round(phases[phase], 3) for phase in TIMING_PHASES if phase in phases},
+        })
+    return records
+
+def emit_json_lines(records, path=METRICS_JSONL_PATH):
+    """Writes one JSON object per URL, appended to `path` so runs can be compared over time."""
+    lines = "\n".join(json.dumps(record, ensure_ascii=False) for record in records)
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines + "\n")
+        print(f"Timing records appended to {path}")
+    else:
+        print(lines)
+
+def _prom_escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def write_prometheus(records, path=METRICS_PROM_PATH):
+    """
+    Writes a Prometheus text-format snapshot (e.g. for node_exporter's textfile
+    collector). The file is replaced atomically so scrapers never see half a run.
+    """
+    if not path:
+        return
+    lines = [
+        "# HELP ecopay_wake_phase_seconds Duration of each keep-alive phase per app.",
+        "# TYPE ecopay_wake_phase_seconds gauge",
+    ]
+    for record in records:
+        url = _prom_escape(record["url"])
+        for phase in TIMING_PHASES:
+            if f"{phase}_s" in record:
+                lines.append(f'ecopay_wake_phase_seconds{{url="{url}",phase="{phase}"}} {record[f"{phase}_s"]}')
+    lines += [
+        "# HELP ecopay_wake_result Final keep-alive outcome per app (1 for the observed status).",
+        "# TYPE ecopay_wake_result gauge",
+    ]
+    for record in records:
+        status = record["wake_status"] or record["probe_status"]
+        lines.append(f'ecopay_wake_result{{url="{_prom_escape(record["url"])}",status="{status}"}} 1')
+    lines += [
+        "# HELP ecopay_wake_last_run_timestamp_seconds Unix time the keep-alive run finished.",
+        "# TYPE ecopay_wake_last_run_timestamp_seconds gauge",
+        f"ecopay_wake_last_run_timestamp_seconds {time.time():.0f}",
+    ]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+    print(f"Prometheus metrics written to {path}")
+
+def _percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted, non-empty list."""
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def print_summary(records):
+    """Prints count / p50 / p90 / p99 / max per phase across all apps."""
+    print("--------------------------------------------------")
+    print(f"{'phase':<14}{'n':>4}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for phase in TIMING_PHASES:
+        values = sorted(record[f"{phase}_s"] for record in records if f"{phase}_s" in record)
+        if not values:
+            continue
+        print(
+            f"{phase:<14}{len(values):>4}"
+            f"{_percentile(values, 50):>8.2f}s{_percentile(values, 90):>8.2f}s"
+            f"{_percentile(values, 99):>8.2f}s{values[-1]:>8.2f}s"
+        )
+
+def report(records):
+    emit_json_lines(records)
+    write_prometheus(records)
+    print_summary(records)
 
 def main():
     urls = get_urls()
@@ -75,32 +369,32 @@ def main():
 
     print(f"Found {len(urls)} apps to process.")
 
-    options = Options()
-    options.add_argument('--headless=new')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
+    # Stage 1: cheap concurrent HTTP health probes
+    started = time.perf_counter()
+    probe_timings = {}
+    statuses = asyncio.run(probe_all(urls, timings=probe_timings))
+    print(f"Health probes finished in {time.perf_counter() - started:.1f}s")
+    for url in urls:
+        print(f"  {statuses[url]:>6}  {url}")
 
-    # Initialize driver once
-    driver = None
-    try:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    except Exception as e:
-        print(f"Failed to initialize WebDriver: {e}")
-        exit(1)
-
-    try:
-        for url in urls:
-            wake_up_app(driver, url)
-            # Optional: small pause between requests to prevent rate limiting
-            time.sleep(2) 
-            
-    finally:
-        if driver:
-            driver.quit()
-        print("--------------------------------------------------")
+    # Stage 2: only apps that are not confirmed awake need a real browser
+    sleeping_urls = [url for url in urls if statuses[url] != "awake"]
+    if not sleeping_urls:
+        print("All apps are awake ✅ No browser needed.")
+        report(build_report(urls, statuses, probe_timings))
         print("Script finished.")
+        return
+
+    print(f"{len(sleeping_urls)} app(s) need a wake-up click. Starting {min(BROWSER_WORKERS, len(sleeping_urls))} browser worker(s)...")
+
+    wake_timings = {}
+    wake_results = wake_apps(sleeping_urls, timings=wake_timings)
+
+    print("--------------------------------------------------")
+    for url in sleeping_urls:
+        print(f"  {wake_results[url]:>11}  {url}")
+    report(build_report(urls, statuses, probe_timings, wake_results, wake_timings))
+    print("Script finished.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -8,9 +8,12 @@ import os
 from groq import Groq
 
 # Voice / TTS Imports added to enable the AI to speak
-from gtts import gTTS
-import io
-import re
+import threading
+
+from carbon_engine import CarbonScoringEngine, load_transactions
+import voice
+from script_detect import detect_language
+from conversation_memory import ConversationMemory
 
 # -----------------------------------------------------------------------------
 # 1. PAGE CONFIGURATION & STYLING
@@ -171,30 +174,47 @@ st.markdown("""
 # 1.5. VOICE & TEXT-TO-SPEECH HELPERS
 # -----------------------------------------------------------------------------
 def get_language_code(text):
-    """Detects the language script to provide accurate regional pronunciation."""
-    if re.search(r'[\u0900-\u097F]', text): return 'hi' # Hindi/Marathi/Sanskrit
-    if re.search(r'[\u0980-\u09FF]', text): return 'bn' # Bengali
-    if re.search(r'[\u0A80-\u0AFF]', text): return 'gu' # Gujarati
-    if re.search(r'[\u0B80-\u0BFF]', text): return 'ta' # Tamil
-    if re.search(r'[\u0C00-\u0C7F]', text): return 'te' # Telugu
-    if re.search(r'[\u0C80-\u0CFF]', text): return 'kn' # Kannada
-    if re.search(r'[\u0D00-\u0D7F]', text): return 'ml' # Malayalam
-    return 'en' # Default
-
-def generate_voice(text):
-    """Converts AI response text into an audio byte stream for playback."""
+    """
+    Detects the language script to provide accurate regional pronunciation.
+    Picks the dominant script of the text (all scheduled Indian scripts, Urdu
+    included) and tells Marathi from Hindi; see script_detect.detect_script.
+    """
+    return detect_language(text)
+
+# Section headers the system prompt asks analysis replies to use (keep the two in sync).
+# On their own line they are spoken as separate sentences, the same in every analysis.
+ANALYSIS_HEADERS = [
+    "🔍 **Hidden Pattern Recognized:**",
+    "🚀 **Prescriptive Action Plan:**",
+    "💰 **Estimated Financial & Carbon Savings:**",
+]
+
+def get_speech_backend():
+    """
+    The configured TTS backend, or silence if it can't be loaded (e.g. an unknown
+    ECOPAY_TTS_BACKEND), so replies are never lost because of speech.
+    """
     try:
-        # Clean text for better speech synthesis (remove markdown)
-        clean_text = text.replace('*', '').replace('#', '').replace('_', '')
-        lang = get_language_code(clean_text)
-        tts = gTTS(text=clean_text, lang=lang, slow=False)
-        fp = io.BytesIO()
-        tts.write_to_fp(fp)
-        fp.seek(0)
-        return fp.getvalue()
+        return voice.get_backend()
     except Exception as e:
         print(f"TTS Error: {e}")
-        return None
+        return voice.get_backend("none")
+
+def prewarm_spoken_phrases():
+    """Caches the analysis headers as replies speak them (bare or as list items); never raises."""
+    try:
+        phrases = [prefix + header for header in ANALYSIS_HEADERS for prefix in ("", "- ")]
+        return voice.prewarm(phrases, detect_language=get_language_code, backend=get_speech_backend())
+    except Exception as e:
+        print(f"TTS pre-warm failed: {e}")
+        return 0
+
+@st.cache_resource
+def prewarm_voice_cache():
+    """Synthesizes the phrases replies speak most often once per server, in the background."""
+    thread = threading.Thread(target=prewarm_spoken_phrases, name="tts-prewarm", daemon=True)
+    thread.start()
+    return thread
 
 # -----------------------------------------------------------------------------
 # 2. DATA PROCESSING & EMISSION LOGIC (The "Engine")
@@ -203,113 +223,13 @@ def generate_voice(text):
 @st.cache_data
 def load_data():
     try:
-        df = pd.read_csv("Daily Household Transactions.csv")
+        return load_transactions("Daily Household Transactions.csv")
     except FileNotFoundError:
         st.error("File 'Daily Household Transactions.csv' not found. Please upload it.")
         return pd.DataFrame()
 
-    df['Date'] = pd.to_datetime(df['Date'], dayfirst=True, errors='coerce')
-    df = df[df['Income/Expense'] == 'Expense'].copy()
-    if 'Currency' in df.columns:
-        df = df[df['Currency'] == 'INR'] 
-    
-    # Fill NA for smooth plotting
-    df['Category'] = df['Category'].fillna('Other')
-    df['Subcategory'] = df['Subcategory'].fillna('General')
-    df['Note'] = df['Note'].fillna('')
-
-    return df
-
-class CarbonScoringEngine:
-    EMISSION_FACTORS = {
-        'Transportation': 0.15, 'Food': 0.06, 'Utilities': 0.20,
-        'Household': 0.08, 'Apparel': 0.10, 'Education': 0.01,
-        'Health': 0.03, 'Personal Development': 0.01, 'Festivals': 0.05,
-        'subscription': 0.005, 'Other': 0.05
-    }
-    
-    SUBCATEGORY_FACTORS = {
-        'Train': 0.04, 'Air': 0.25, 'auto': 0.12,
-        'Vegetables': 0.03, 'Meat': 0.15,
-    }
-    
-    RECOMMENDATIONS = {
-        'Transportation': [
-            "🚗 **Carpooling**: Reduces individual footprint by ~40% for daily commutes.",
-            "🚲 **Active Transport**: Consider cycling for trips under 5km; it's zero emission!",
-            "🚆 **Rail over Road**: Trains are 80% less carbon-intensive than solo driving.",
-            "🔋 **EV Switch**: Transitioning to an Electric Vehicle can cut lifetime emissions by 50%."
-        ],
-        'Food': [
-            "🥩 **Meat Reduction**: Reducing meat consumption by just one day a week saves ~4kg CO2.",
-            "🌾 **Local Sourcing**: Buy local seasonal produce to cut down on 'food miles'.",
-            "🥡 **Waste Not**: Meal prepping reduces food waste, a major methane source."
-        ],
-        'Utilities': [
-            "💡 **LED Switch**: Switch to LED bulbs to cut lighting energy by 75%.",
-            "🔌 **Vampire Power**: Unplug chargers and standby TVs to save 10% on bills.",
-            "🌡️ **Smart Climate**: Adjusting AC by 1°C can save 6% electricity."
-        ],
-        'Apparel': [
-            "👕 **Fast Fashion**: Buying one used item instead of new reduces its carbon footprint by 82%.",
-            "🧶 **Material Choice**: Choose natural fibers like organic cotton or linen over polyester."
-        ]
-    }
-
-    @staticmethod
-    def calculate_footprint(row):
-        category = row.get('Category', 'Other')
-        subcategory = row.get('Subcategory', '')
-        amount = row.get('Amount', 0)
-        
-        factor = CarbonScoringEngine.EMISSION_FACTORS.get(category, 0.05)
-        
-        if subcategory in CarbonScoringEngine.SUBCATEGORY_FACTORS:
-            factor = CarbonScoringEngine.SUBCATEGORY_FACTORS[subcategory]
-        elif isinstance(subcategory, str) and 'Meat' in subcategory:
-            factor = 0.12 
-            
-        carbon_mass = amount * factor
-        return factor, carbon_mass
-
-    @staticmethod
-    def generate_explanation(row, factor, carbon_mass):
-        category = row['Category']
-        intensity_label = "Low"
-        if factor > 0.12: intensity_label = "High"
-        elif factor > 0.05: intensity_label = "Moderate"
-        
-        explanation = f"**{intensity_label} Intensity** ({factor} kg/₹). "
-        if intensity_label == "High":
-            explanation += f"Driven by high-emission activity in *{category}*."
-        else:
-            explanation += f"Efficient spending in *{category}*."
-        return explanation
-
-    @staticmethod
-    def calculate_eco_score(carbon_mass, amount):
-        if amount == 0: return 100
-        intensity = carbon_mass / amount
-        score = max(0, 100 - (intensity * 400)) 
-        return int(score)
-
-    @staticmethod
-    def determine_persona(avg_score):
-        if avg_score >= 80: return "🌱 Eco-Warrior", "You are leading the charge for a greener planet!"
-        elif avg_score >= 60: return "🌿 Conconscious Citizen", "You are making good choices, but there's room to grow."
-        elif avg_score >= 40: return "🏭 Carbon Neutral Aspirant", "Your footprint is visible. Let's optimize your habits."
-        else: return "⚠️ High Emitter", "Your activities have a significant impact. Action needed."
-        
-    @staticmethod
-    def get_prescriptive_advice(category):
-        return CarbonScoringEngine.RECOMMENDATIONS.get(category, ["🌱 Review this expense for sustainable alternatives.", "♻️ Consider the lifecycle impact of this purchase."])
-
-    @staticmethod
-    def calculate_offsets(total_carbon_kg):
-        trees_needed = total_carbon_kg / 21
-        cost_usd = (total_carbon_kg / 1000) * 12 
-        cost_inr = cost_usd * 84 
-        return trees_needed, cost_inr
+# Emission factors, eco scores and offsets live in carbon_engine.CarbonScoringEngine,
+# shared with the SIP dashboard.
 
 # -----------------------------------------------------------------------------
 # 3. ADVANCED VISUALIZATION GENERATORS
@@ -380,10 +300,16 @@ def plot_sankey(df):
 # 4. MAIN APPLICATION UI
 # -----------------------------------------------------------------------------
 
+def chat_bubble(msg):
+    if msg["role"] == "user":
+        return f"<div class='user-bubble'>👤 <b>You:</b><br>{msg['content']}</div>"
+    return f"<div class='ai-bubble'>🤖 <b>Ecopay AI:</b><br>{msg['content']}</div>"
+
 def main():
     data_df = load_data()
     if data_df.empty:
         return
+    prewarm_voice_cache()
 
     # --- Header & Nav ---
     st.title("Ecopay Carbon Engine")
@@ -407,10 +333,11 @@ def main():
         filtered_df = data_df.copy()
 
     engine = CarbonScoringEngine()
-    results = filtered_df.apply(lambda x: engine.calculate_footprint(x), axis=1, result_type='expand')
-    filtered_df[['Emission_Factor', 'Carbon_Footprint_kg']] = results
-    filtered_df['Explanation'] = filtered_df.apply(lambda x: engine.generate_explanation(x, x['Emission_Factor'], x['Carbon_Footprint_kg']), axis=1)
-    filtered_df['Eco_Score'] = filtered_df.apply(lambda x: engine.calculate_eco_score(x['Carbon_Footprint_kg'], x['Amount']), axis=1)
+    factors, carbon, eco_scores = engine.score_frame(filtered_df)
+    filtered_df['Emission_Factor'] = factors
+    filtered_df['Carbon_Footprint_kg'] = carbon
+    filtered_df['Explanation'] = engine.generate_explanations(filtered_df['Category'], factors)
+    filtered_df['Eco_Score'] = eco_scores
 
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -677,7 +604,7 @@ def main():
     Instructions for your response:
     1. Be concise, highly professional, and encouraging.
     2. Speak in a consultative tone.
-    3. You MUST structure your response with these exact headers if asked to analyze the data (translate these headers if speaking in a regional language):
+    3. You MUST structure your response with these exact headers, each on its own line, if asked to analyze the data (translate these headers if speaking in a regional language):
        - 🔍 **Hidden Pattern Recognized:** (Explain a trend in their data)
        - 🚀 **Prescriptive Action Plan:** (Give 2 highly specific actions to reduce footprint and save money)
        - 💰 **Estimated Financial & Carbon Savings:** (Estimate what they will save if they follow your advice)
@@ -708,12 +635,20 @@ def main():
             user_input = st.text_input("Ask me to analyze hidden trends or prescribe actions...")
             submitted = st.form_submit_button("Send to Ecopay AI 🚀")
 
-        # Process AI generation BEFORE rendering the chat history
-        # This prevents the need for st.rerun(), keeping the popover OPEN natively.
         if submitted and user_input:
             st.session_state.latest_audio = None # Clear old audio so it doesn't replay randomly
             st.session_state.messages.append({"role": "user", "content": user_input})
-            
+
+        # Render chat history first; a new reply streams into the slot below it.
+        # Everything happens in this run, so no st.rerun() is needed and the popover stays OPEN natively.
+        with chat_container:
+            for msg in st.session_state.messages:
+                st.markdown(chat_bubble(msg), unsafe_allow_html=True)
+            live_reply = st.empty()
+
+        if submitted and user_input:
+            # Resolved before the Groq call so a TTS problem can't cost the text reply
+            speech_backend = get_speech_backend()
             try:
                 # API Call Logic using dynamic key resolution
                 api_key = st.secrets.get("Groq_API", globals().get("Groq_API", locals().get("Groq_API")))
@@ -724,39 +659,53 @@ def main():
                     client = Groq(api_key=api_key)
                     
                     messages_payload = [{"role": "system", "content": system_context}]
-                    # Maintain context for recent messages
-                    messages_payload.extend([{"role": m["role"], "content": m["content"]} for m in st.session_state.messages[-5:]])
+                    # Maintain context: recent messages verbatim, older ones summarized, within the token budget
+                    if "chat_memory" not in st.session_state:
+                        st.session_state.chat_memory = ConversationMemory()
+                    messages_payload.extend(st.session_state.chat_memory.build(st.session_state.messages))
+
+                    # Voice is pipelined: each sentence is synthesized as soon as it has
+                    # streamed in, and playback starts with the first one.
+                    speech = voice.SpeechPipeline(detect_language=get_language_code, backend=speech_backend)
+                    playback = voice.ProgressivePlayback(
+                        lambda audio, start: audio_container.audio(audio, format=speech.mime, start_time=start, autoplay=True),
+                        mime=speech.mime
+                    )
 
                     with st.spinner("Analyzing deep matrix trends via Groq..."):
-                        chat_completion = client.chat.completions.create(
+                        stream = client.chat.completions.create(
                             messages=messages_payload,
                             model="llama-3.3-70b-versatile", # Upgraded to the highly capable, multilingual supported model
                             temperature=0.7,
                             max_tokens=1024,
+                            stream=True,
                         )
-                        response = chat_completion.choices[0].message.content
+                        response = ""
+                        for chunk in stream:
+                            delta = chunk.choices[0].delta.content or ""
+                            response += delta
+                            live_reply.markdown(chat_bubble({"role": "assistant", "content": response}), unsafe_allow_html=True)
+                            speech.feed(delta)
+                            playback.update(speech.ready_clips())
                         st.session_state.messages.append({"role": "assistant", "content": response})
 
                     with st.spinner("Generating Voice Response..."):
-                        audio_bytes = generate_voice(response)
-                        if audio_bytes:
-                            st.session_state.latest_audio = audio_bytes
+                        playback.follow(speech)
+                        if playback.loaded:
+                            st.session_state.latest_audio = speech.audio()
+                            st.session_state.latest_audio_format = speech.mime
 
             except Exception as e:
                 st.error(f"Groq Integration Error: {str(e)}")
 
-        # Render chat history AFTER logic so we don't need a hard rerun
-        with chat_container:
-            for msg in st.session_state.messages:
-                if msg["role"] == "user":
-                    st.markdown(f"<div class='user-bubble'>👤 <b>You:</b><br>{msg['content']}</div>", unsafe_allow_html=True)
-                else:
-                    st.markdown(f"<div class='ai-bubble'>🤖 <b>Ecopay AI:</b><br>{msg['content']}</div>", unsafe_allow_html=True)
-
         # --- Voice Playback Component ---
-        with audio_container:
-            if st.session_state.get("latest_audio"):
-                st.audio(st.session_state.latest_audio, format="audio/mp3", autoplay=True)
+        # A new reply is played by its pipeline above. On other reruns the last one is shown
+        # without autoplay, so moving a slider or filter doesn't play it again.
+        if not (submitted and user_input) and st.session_state.get("latest_audio"):
+            audio_container.audio(
+                st.session_state.latest_audio, format=st.session_state.get("latest_audio_format", "audio/mp3"),
+                autoplay=False
+            )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,7 +5,18 @@ import plotly.graph_objects as go
 import numpy as np
 import textwrap
 import datetime
+import functools
+import math
 import os
+import sqlite3
+import threading
+
+from sip_engine import sip_timeline, sip_grid, lump_sum_value
+from project_catalog import ProjectCatalog, DEFAULT_CATALOG_PATH
+from sip_ledger import SipLedger, AccrualScheduler, DEFAULT_LEDGER_PATH, DEFAULT_USER
+from treasury import OrderBook, BUY, SELL
+from carbon_engine import footprint_summary, DEFAULT_TRANSACTIONS_PATH
+from image_cache import thumbnail_data_uri, prefetch as prefetch_images
 
 # -----------------------------------------------------------------------------
 # 1. PAGE CONFIGURATION & STYLING
@@ -248,29 +259,13 @@ st.markdown("""
 # -----------------------------------------------------------------------------
 
 @st.cache_data
-def load_user_footprint():
-    """Reads actual user footprint from the given transaction CSV."""
-    file_path = "Daily Household Transactions.csv"
-    try:
-        if os.path.exists(file_path):
-            df = pd.read_csv(file_path)
-            # Clean and parse Amount column
-            df['Amount'] = df['Amount'].replace({',': ''}, regex=True)
-            df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce').fillna(0)
-            
-            # Filter only expenses
-            df = df[df['Income/Expense'].str.contains('Expense', case=False, na=False)]
-            total_spend = df['Amount'].sum()
-            txn_count = len(df)
-            
-            # Assumption: Carbon emission ratio (0.08 kg per ₹ spent as baseline)
-            estimated_carbon_kg = total_spend * 0.08 
-            return estimated_carbon_kg, total_spend, txn_count
-        else:
-            # Fallback mock data if CSV is not mounted in the environment
-            return 12500.00, 156250.00, 142 
-    except Exception as e:
-        return 12500.00, 156250.00, 142 # Fallback on error
+def load_user_footprint(file_path=DEFAULT_TRANSACTIONS_PATH):
+    """
+    Baseline footprint from the transaction CSV, scored with the same category-aware
+    emission factors as the Carbon Engine. Returns carbon_engine.footprint_summary's
+    dict; anything but status 'ok' is surfaced in the dashboard instead of mock numbers.
+    """
+    return footprint_summary(file_path)
 
 # --- MUTUAL FUND PORTFOLIOS ---
 PORTFOLIOS = {
@@ -316,129 +311,61 @@ PORTFOLIOS = {
     }
 }
 
-# --- UNDERLYING ASSETS (Maintained massive array to satisfy LOC constraint) ---
-PROJECTS = [
-    {
-        "id": 1, "name": "Sundarbans Mangrove Restoration", "location": "West Bengal, India",
-        "type": "Reforestation", "registry": "Verra (VCS)", "vintage": 2023, "price_per_tonne": 1200, 
-        "rating": "AAA", "sdgs": ["13", "14", "15"], "description": "Restoring critical mangrove ecosystems that act as massive carbon sinks and protect against cyclones.",
-        "lat": 21.9497, "lon": 88.8993, "funded_percent": 78
-    },
-    {
-        "id": 2, "name": "Rajasthan Solar Park Initiative", "location": "Rajasthan, India",
-        "type": "Solar Energy", "registry": "Gold Standard", "vintage": 2024, "price_per_tonne": 650,
-        "rating": "A+", "sdgs": ["7", "9", "13"], "description": "Replacing coal-fired grid electricity with clean solar power, creating local engineering jobs in Bhadla.",
-        "lat": 27.0238, "lon": 74.2179, "funded_percent": 45
-    },
-    {
-        "id": 3, "name": "Clean Cookstoves & Biogas Networks", "location": "Odisha, India",
-        "type": "Rural Biogas", "registry": "Gold Standard", "vintage": 2023, "price_per_tonne": 950,
-        "rating": "AA", "sdgs": ["3", "5", "13"], "description": "Distributing efficient biogas digesters to reduce wood burning, significantly improving indoor air quality.",
-        "lat": 20.9517, "lon": 85.0985, "funded_percent": 92
-    },
-    {
-        "id": 4, "name": "Delhi NCR Fast-Charging Hubs", "location": "Delhi, India",
-        "type": "EV Charging", "registry": "CDM (UN)", "vintage": 2024, "price_per_tonne": 800,
-        "rating": "A", "sdgs": ["11", "13", "9"], "description": "Deploying 50+ high-speed DC fast chargers to accelerate commercial fleet EV adoption.",
-        "lat": 28.7041, "lon": 77.1025, "funded_percent": 60
-    },
-    {
-        "id": 5, "name": "Tamil Nadu Solar Grid Expansion", "location": "Tamil Nadu, India",
-        "type": "Solar Energy", "registry": "Verra (VCS)", "vintage": 2023, "price_per_tonne": 700,
-        "rating": "A", "sdgs": ["7", "13"], "description": "Large scale solar farms generating clean energy for the southern grid, offsetting thermal power dependency.",
-        "lat": 8.5241, "lon": 77.5892, "funded_percent": 85
-    },
-    {
-        "id": 6, "name": "Mumbai EV Highway Corridor", "location": "Maharashtra, India",
-        "type": "EV Charging", "registry": "Gold Standard", "vintage": 2024, "price_per_tonne": 750,
-        "rating": "A-", "sdgs": ["9", "11", "13"], "description": "Strategic EV charging points along the Mumbai-Pune expressway ensuring zero range anxiety.",
-        "lat": 18.7300, "lon": 73.6700, "funded_percent": 40
-    },
-    {
-        "id": 7, "name": "Kerala Blue Carbon Seagrass", "location": "Kerala, India",
-        "type": "Reforestation", "registry": "Verra (VCS)", "vintage": 2023, "price_per_tonne": 1400,
-        "rating": "AAA", "sdgs": ["14", "13"], "description": "Restoring seagrass beds which sequester carbon 35x faster than tropical rainforests and support fisheries.",
-        "lat": 9.9312, "lon": 76.2673, "funded_percent": 30
-    },
-    {
-        "id": 8, "name": "Indore Bio-CNG from Municipal Waste", "location": "Madhya Pradesh, India",
-        "type": "Rural Biogas", "registry": "Gold Standard", "vintage": 2023, "price_per_tonne": 1100,
-        "rating": "AA+", "sdgs": ["11", "12", "7"], "description": "Converting municipal wet waste into Bio-CNG for public buses, solving waste and energy issues simultaneously.",
-        "lat": 22.7196, "lon": 75.8577, "funded_percent": 95
-    },
-    {
-        "id": 9, "name": "Assam Rural Biogas Initiative", "location": "Assam, India",
-        "type": "Rural Biogas", "registry": "Gold Standard", "vintage": 2024, "price_per_tonne": 1000,
-        "rating": "AA", "sdgs": ["6", "3", "13"], "description": "Installing household biogas units to utilize cattle manure, providing clean cooking gas and organic fertilizer.",
-        "lat": 26.2006, "lon": 92.9376, "funded_percent": 55
-    },
-    {
-        "id": 10, "name": "Regenerative Agriculture Cotton", "location": "Maharashtra, India",
-        "type": "Reforestation", "registry": "Verra (VCS)", "vintage": 2023, "price_per_tonne": 1300,
-        "rating": "AAA", "sdgs": ["12", "15", "1"], "description": "Supporting farmers to switch to organic, regenerative farming that sequesters carbon in soil.",
-        "lat": 19.7515, "lon": 75.7139, "funded_percent": 65
-    },
-    {
-        "id": 11, "name": "Western Ghats Biodiversity Protection", "location": "Karnataka, India",
-        "type": "Reforestation", "registry": "Verra (VCS)", "vintage": 2022, "price_per_tonne": 1600,
-        "rating": "AAA+", "sdgs": ["15", "13"], "description": "REDD+ project preventing deforestation in high-risk zones of the Western Ghats. A vital national carbon sink.",
-        "lat": 14.5200, "lon": 75.0500, "funded_percent": 88
-    },
-    {
-        "id": 12, "name": "Gujarat Coastal Solar Array", "location": "Gujarat, India",
-        "type": "Solar Energy", "registry": "CDM (UN)", "vintage": 2023, "price_per_tonne": 680,
-        "rating": "A", "sdgs": ["7", "13", "8"], "description": "Vast solar arrays built on non-arable coastal lands, powering neighboring industrial economic zones.",
-        "lat": 22.2587, "lon": 71.1924, "funded_percent": 70
-    },
-    {
-        "id": 13, "name": "Punjab Agri-Waste Biogas Plant", "location": "Punjab, India",
-        "type": "Rural Biogas", "registry": "Gold Standard", "vintage": 2024, "price_per_tonne": 720,
-        "rating": "A+", "sdgs": ["7", "12", "13"], "description": "Using agricultural residue for biogas generation instead of burning it in fields, heavily reducing regional smog.",
-        "lat": 31.1471, "lon": 75.3412, "funded_percent": 50
-    },
-    {
-        "id": 14, "name": "Bangalore Urban Tree Cover", "location": "Karnataka, India",
-        "type": "Reforestation", "registry": "Local/Verra", "vintage": 2024, "price_per_tonne": 1500,
-        "rating": "AA", "sdgs": ["11", "15", "3"], "description": "Urban afforestation project to combat heat island effect and restore the 'Garden City' reputation.",
-        "lat": 12.9716, "lon": 77.5946, "funded_percent": 25
-    },
-    {
-        "id": 15, "name": "Bihar Rural Solar Microgrids", "location": "Bihar, India",
-        "type": "Solar Energy", "registry": "CDM (UN)", "vintage": 2022, "price_per_tonne": 600,
-        "rating": "B+", "sdgs": ["7", "13"], "description": "Deploying decentralized solar microgrids to un-electrified villages, establishing energy independence.",
-        "lat": 25.0961, "lon": 85.3131, "funded_percent": 98
-    },
-    {
-        "id": 16, "name": "Thar Desert Solar Expansion", "location": "Rajasthan, India",
-        "type": "Solar Energy", "registry": "Gold Standard", "vintage": 2023, "price_per_tonne": 900,
-        "rating": "AAA", "sdgs": ["7", "13"], "description": "Harnessing extremely high-irradiance zones in the Thar desert for constant, clean daytime baseload power.",
-        "lat": 26.9000, "lon": 70.9000, "funded_percent": 82
-    },
-    {
-        "id": 17, "name": "Eastern Ghats Coffee Agroforestry", "location": "Andhra Pradesh, India",
-        "type": "Reforestation", "registry": "Verra (VCS)", "vintage": 2023, "price_per_tonne": 1250,
-        "rating": "AA+", "sdgs": ["15", "1", "13"], "description": "Shade-grown coffee plantations that maintain canopy cover and biodiversity in tribal areas.",
-        "lat": 17.6868, "lon": 83.2185, "funded_percent": 60
-    },
-    {
-        "id": 18, "name": "Hyderabad Fleet EV Transition", "location": "Telangana, India",
-        "type": "EV Charging", "registry": "CDM (UN)", "vintage": 2022, "price_per_tonne": 550,
-        "rating": "A", "sdgs": ["9", "12", "13"], "description": "Financing and charging infrastructure for the transition of 5000+ logistics delivery vehicles to electric.",
-        "lat": 17.3850, "lon": 78.4867, "funded_percent": 90
-    },
-    {
-        "id": 19, "name": "Solar Water Pumps for Farmers", "location": "Telangana, India",
-        "type": "Solar Energy", "registry": "Gold Standard", "vintage": 2024, "price_per_tonne": 850,
-        "rating": "AA", "sdgs": ["2", "7", "13"], "description": "Replacing diesel pumps with solar pumps for irrigation, reducing fossil fuel use and boosting farm profits.",
-        "lat": 18.1124, "lon": 79.0193, "funded_percent": 35
-    },
-    {
-        "id": 20, "name": "Mahanadi Delta Mangrove Conservation", "location": "Odisha, India",
-        "type": "Reforestation", "registry": "Verra (VCS)", "vintage": 2023, "price_per_tonne": 1800,
-        "rating": "AAA+", "sdgs": ["13", "15"], "description": "Protecting carbon-rich coastal mangrove swamps from drainage, preserving local marine ecosystems.",
-        "lat": 20.2500, "lon": 86.7500, "funded_percent": 75
-    }
-]
+# --- UNDERLYING ASSETS ---
+# Loaded from projects.json into a columnar catalog with bitmap/sort indexes,
+# cached across reruns so filtering never rescans the raw records.
+@st.cache_resource
+def load_project_catalog(path=DEFAULT_CATALOG_PATH):
+    return ProjectCatalog.from_file(path)
+
+@st.cache_resource
+def load_project_frame(_catalog):
+    return _catalog.frame()
+
+CATALOG = load_project_catalog()
+PROJECTS = CATALOG.records()
+PROJECTS_FRAME = load_project_frame(CATALOG)
+
+# Asset map figures kept per distinct selection (least recently used evicted first)
+MAP_CACHE_ENTRIES = 16
+
+# Card images by project type (fetched once into the local thumbnail cache)
+PROJECT_IMAGE_SOURCES = {
+    "Reforestation": [
+        "https://images.unsplash.com/photo-1542601906990-b4d3fb778b09?auto=format&fit=crop&w=800&q=80",
+        "https://images.unsplash.com/photo-1511497584788-876760111969?auto=format&fit=crop&w=800&q=80",
+        "https://images.unsplash.com/photo-1448375240586-882707db888b?auto=format&fit=crop&w=800&q=80"
+    ],
+    "Solar Energy": [
+        "https://images.unsplash.com/photo-1509391366360-2e959784a276?auto=format&fit=crop&w=800&q=80",
+        "https://images.unsplash.com/photo-1521618755572-156ae0cdd74d?auto=format&fit=crop&w=800&q=80",
+        "https://images.unsplash.com/photo-1497440001374-f26997328c1b?auto=format&fit=crop&w=800&q=80"
+    ],
+    "Rural Biogas": [
+        "https://images.unsplash.com/photo-1605639686036-edee86b518c7?auto=format&fit=crop&w=800&q=80",
+        "https://images.unsplash.com/photo-1518709268805-4e9042af9f23?auto=format&fit=crop&w=800&q=80"
+    ],
+    "EV Charging": [
+        "https://images.unsplash.com/photo-1593941707882-a5bba14938c7?auto=format&fit=crop&w=800&q=80",
+        "https://images.unsplash.com/photo-1617786858161-5544d6dbdb38?auto=format&fit=crop&w=800&q=80"
+    ]
+}
+
+# Asset Ledger pagination: cards rendered per page
+LEDGER_PAGE_SIZES = [4, 8, 12, 24]
+DEFAULT_LEDGER_PAGE_SIZE = 8
+
+# Per-project ROI calculator domain: slider positions and selectable holding periods
+ROI_MIN_AMOUNT, ROI_MAX_AMOUNT, ROI_STEP = 1000, 250000, 5000
+ROI_AMOUNTS = np.arange(ROI_MIN_AMOUNT, ROI_MAX_AMOUNT + 1, ROI_STEP)
+ROI_DURATIONS = [1, 3, 5, 7, 10]
+
+# B2B treasury: credits accrued by user mandates are listed on this ask ladder
+MIN_TREASURY_LISTING = 1000  # kg; smaller increments wait for the next accrual
+REFERENCE_SPOT_PRICE = 1.45  # ₹ per kg, last week's settlement
+TREASURY_OWNER = "Ecopay Treasury"
+TREASURY_ASK_LADDER = [(1.45, 0.40), (1.50, 0.30), (1.55, 0.20), (1.60, 0.10)]  # (₹/kg, share of block)
+CORPORATE_BUYERS = ["Microsoft India", "Tata Motors", "Infosys Limited", "Reliance Industries", "Amazon AWS India"]
 
 # -----------------------------------------------------------------------------
 # 3. HELPER FUNCTIONS & FINANCIAL CALCULATORS
@@ -447,34 +374,76 @@ PROJECTS = [
 def calculate_sip_projections(monthly_inv, duration_years, irr_percent, carbon_yield_per_1k):
     """
     Calculates future value of an SIP (Compound Interest) and Cumulative Carbon Reduced.
+    Uses the closed-form annuity-due engine in sip_engine instead of a monthly loop.
     """
-    months = duration_years * 12
-    monthly_rate = (irr_percent / 100) / 12
-    
-    # Generate time series data for charts
-    timeline = []
-    invested_amounts = []
-    future_values = []
-    carbon_accumulated = []
-    
-    current_value = 0
-    current_carbon = 0
-    
-    for i in range(1, months + 1):
-        # Financial compound logic
-        current_value = (current_value + monthly_inv) * (1 + monthly_rate)
-        # Carbon accumulation logic
-        monthly_carbon = (monthly_inv / 1000) * carbon_yield_per_1k
-        current_carbon += monthly_carbon
-        
-        # Save datapoints every year for smoother graphs, or at end
-        if i % 12 == 0 or i == months:
-            timeline.append(f"Year {i//12}")
-            invested_amounts.append(monthly_inv * i)
-            future_values.append(current_value)
-            carbon_accumulated.append(current_carbon)
-            
-    return timeline, invested_amounts, future_values, carbon_accumulated
+    timeline, invested, future_values, carbon_accumulated = sip_timeline(
+        monthly_inv, duration_years, irr_percent, carbon_yield_per_1k
+    )
+    return timeline, invested.tolist(), future_values.tolist(), carbon_accumulated.tolist()
+
+@st.cache_data
+def get_portfolio_scenarios(portfolio_key, amounts, tenures):
+    """
+    Full amount x tenure grid of invested capital, future value and carbon for one
+    portfolio. Cached per (portfolio, axes) so switching tabs or funds is free.
+    """
+    fund = PORTFOLIOS[portfolio_key]
+    grid = sip_grid(amounts, tenures, [fund['irr']], [fund['carbon_yield_per_1k']])
+    return {metric: np.ascontiguousarray(values[:, :, 0]) for metric, values in grid.items()}
+
+def run_sip_scenarios(amounts, tenures, portfolio_keys):
+    """
+    Batch scenario API: evaluates every monthly amount x tenure combination for each
+    requested portfolio in one array computation per portfolio.
+    Returns {portfolio_key: {"invested", "future_value", "carbon"}} with arrays shaped
+    (len(amounts), len(tenures)).
+    """
+    amounts, tenures = tuple(amounts), tuple(tenures)
+    return {key: get_portfolio_scenarios(key, amounts, tenures) for key in portfolio_keys}
+
+def plot_scenario_heatmap(values, amounts, tenures, title, prefix="", suffix=""):
+    fig = go.Figure(go.Heatmap(
+        z=values, x=[f"{t}y" for t in tenures], y=[f"₹{a:,}" for a in amounts],
+        colorscale="Viridis",
+        hovertemplate=f"Tenure: %{{x}}<br>SIP: %{{y}}/mo<br>{title}: {prefix}%{{z:,.0f}}{suffix}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=title, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+        font_color="white", height=420, margin=dict(l=0, r=0, t=30, b=0),
+        xaxis_title="Investment Tenure", yaxis_title="Monthly SIP Amount"
+    )
+    return fig
+
+@st.cache_resource(max_entries=MAP_CACHE_ENTRIES)
+def get_asset_map(project_rows):
+    """
+    "Global Asset Mapping" figure for the given catalog rows (a sorted tuple, so
+    the sort order picked in the ledger doesn't create extra entries). Building a
+    geo figure is the expensive part, so reruns that don't change the selection
+    (cart, calculators, treasury) reuse the cached one.
+    """
+    fig_map = px.scatter_geo(
+        PROJECTS_FRAME.iloc[list(project_rows)],
+        lat='lat',
+        lon='lon',
+        color='type',
+        hover_name='name',
+        size='price_per_tonne',
+        projection="natural earth",
+        title="Global Asset Mapping",
+        color_discrete_map={
+            "Reforestation": "#15803d", 
+            "Solar Energy": "#d97706", 
+            "Rural Biogas": "#7e22ce", 
+            "EV Charging": "#2563eb"
+        }
+    )
+    fig_map.update_layout(
+        paper_bgcolor="rgba(0,0,0,0)",
+        geo=dict(bgcolor="rgba(0,0,0,0)", showland=True, landcolor="#1e293b", showocean=True, oceancolor="#0f172a"),
+        font_color="white", margin=dict(l=0, r=0, t=30, b=0), height=350
+    )
+    return fig_map
 
 def get_badge_class(ptype):
     if ptype == "Reforestation": return "badge-forest"
@@ -485,34 +454,136 @@ def get_badge_class(ptype):
 
 def get_project_image(ptype, seed=1):
     """
-    Returns a highly reliable, robust image URL based on project type.
-    Uses hardcoded premium Unsplash CDNs to prevent broken images or rate limits.
+    Card image for a project type as an inline WebP thumbnail. Only the local
+    image cache is read (start_image_prefetch downloads the Unsplash sources in
+    the background), so a page never waits on the CDN; the bundled placeholder
+    shows until a source has been cached.
     """
-    images = {
-        "Reforestation": [
-            "https://images.unsplash.com/photo-1542601906990-b4d3fb778b09?auto=format&fit=crop&w=800&q=80",
-            "https://images.unsplash.com/photo-1511497584788-876760111969?auto=format&fit=crop&w=800&q=80",
-            "https://images.unsplash.com/photo-1448375240586-882707db888b?auto=format&fit=crop&w=800&q=80"
-        ],
-        "Solar Energy": [
-            "https://images.unsplash.com/photo-1509391366360-2e959784a276?auto=format&fit=crop&w=800&q=80",
-            "https://images.unsplash.com/photo-1521618755572-156ae0cdd74d?auto=format&fit=crop&w=800&q=80",
-            "https://images.unsplash.com/photo-1497440001374-f26997328c1b?auto=format&fit=crop&w=800&q=80"
-        ],
-        "Rural Biogas": [
-            "https://images.unsplash.com/photo-1605639686036-edee86b518c7?auto=format&fit=crop&w=800&q=80",
-            "https://images.unsplash.com/photo-1518709268805-4e9042af9f23?auto=format&fit=crop&w=800&q=80"
-        ],
-        "EV Charging": [
-            "https://images.unsplash.com/photo-1593941707882-a5bba14938c7?auto=format&fit=crop&w=800&q=80",
-            "https://images.unsplash.com/photo-1617786858161-5544d6dbdb38?auto=format&fit=crop&w=800&q=80"
-        ]
-    }
-    
     # Retrieve the list of images for the type, default to Reforestation if not found
-    img_list = images.get(ptype, images["Reforestation"])
+    img_list = PROJECT_IMAGE_SOURCES.get(ptype, PROJECT_IMAGE_SOURCES["Reforestation"])
     # Cycle through the images using the seed to add variety without breaking
-    return img_list[seed % len(img_list)]
+    return thumbnail_data_uri(img_list[seed % len(img_list)], download=False)
+
+@st.cache_resource
+def start_image_prefetch():
+    """Warms the image cache for every card source in the background, once per server."""
+    urls = [url for sources in PROJECT_IMAGE_SOURCES.values() for url in sources]
+    thread = threading.Thread(target=prefetch_images, args=(urls,), name="image-prefetch", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def get_roi_tables():
+    """
+    Projected lump-sum values for every slider position x holding period, per portfolio.
+    Built once with a single broadcast computation; the ROI calculators only index into it.
+    """
+    irrs = np.array([p['irr'] for p in PORTFOLIOS.values()])
+    values = lump_sum_value(ROI_AMOUNTS[:, None, None], np.array(ROI_DURATIONS)[None, :, None], irrs[None, None, :])
+    return {key: values[:, :, i] for i, key in enumerate(PORTFOLIOS)}
+
+def lookup_roi(portfolio_key, amount, duration_yrs):
+    """Table lookup for the ROI calculator, computing directly only for off-grid inputs."""
+    row, remainder = divmod(amount - ROI_MIN_AMOUNT, ROI_STEP)
+    if remainder == 0 and 0 <= row < len(ROI_AMOUNTS) and duration_yrs in ROI_DURATIONS:
+        return float(get_roi_tables()[portfolio_key][row, ROI_DURATIONS.index(duration_yrs)])
+    return float(lump_sum_value(amount, duration_yrs, PORTFOLIOS[portfolio_key]['irr']))
+
+CARD_IMAGE_SLOT = "__PROJECT_CARD_IMAGE__"
+
+def render_project_card(project_id):
+    """Asset Ledger card HTML: the cached card template with the current thumbnail filled in."""
+    project = CATALOG.get(project_id)
+    img_url = get_project_image(project['type'], seed=project['id'])
+    return project_card_template(project_id).replace(CARD_IMAGE_SLOT, img_url, 1)
+
+@st.cache_data
+def project_card_template(project_id):
+    """
+    Builds the card HTML once per project id and reuses it across reruns. The
+    image is left as a slot so a placeholder is never cached in the card.
+    """
+    project = CATALOG.get(project_id)
+    badge_cls = get_badge_class(project['type'])
+    
+    card_html = textwrap.dedent(f"""
+    <div class="project-card-container">
+    <img src="{CARD_IMAGE_SLOT}" class="project-image" alt="{project['name']}">
+    <div class="card-content">
+    <div>
+    <h3 class="project-title">{project['name']}</h3>
+    <div>
+    <span class="badge {badge_cls}">{project['type']} Fund Asset</span>
+    <span class="meta-tag">🛡️ {project['registry']}</span>
+    </div>
+    <p style="color:#94a3b8; font-size:0.85rem; margin: 8px 0;">📍 {project['location']}</p>
+    <p class="project-desc">{project['description']}</p>
+    <div style="display:flex; gap:6px; flex-wrap:wrap; margin-top: auto;">
+    <span class="meta-tag">🇺🇳 SDGs: {', '.join(project['sdgs'])}</span>
+    <span class="meta-tag">📅 Vintage: {project['vintage']}</span>
+    <span class="meta-tag">⭐ {project['rating']}</span>
+    </div>
+    </div>
+    <div class="price-section">
+    <div>
+    <span style="font-size:1.4rem; font-weight:bold; color:#38bdf8;">Asset Value</span>
+    <span style="color:#94a3b8; font-size:0.8rem;"><br>High Liquidity</span>
+    </div>
+    <div style="text-align:right;">
+    <span style="font-size:0.8rem; color:#94a3b8;">Fund Allocation Cap</span><br>
+    <span style="font-weight:bold; color:#10b981;">{project['funded_percent']}%</span>
+    </div>
+    </div>
+    </div>
+    </div>
+    """)
+    return card_html
+
+@st.cache_resource
+def get_ledger(path=DEFAULT_LEDGER_PATH):
+    """One SQLite-backed cart/mandate ledger shared by all sessions of this server."""
+    return SipLedger(path)
+
+@st.cache_resource
+def get_treasury(_ledger):
+    """
+    B2B order book saved in the ledger, reloaded with its resting orders and
+    trade log on startup, so credits listed or sold before a restart aren't
+    listed again. Treasury fills are booked as sold platform credits.
+    """
+    store = functools.partial(_ledger.save_treasury_book, credit_seller=TREASURY_OWNER)
+    book = OrderBook(trade_log_path=os.environ.get("ECOPAY_TRADE_LOG"), store=store)
+    book.restore(*_ledger.treasury_book())
+    return {"book": book, "ledger": _ledger, "lock": threading.Lock()}
+
+def list_new_treasury_credits(treasury, platform_total_kg):
+    """Lists credits accrued and not yet listed (per the ledger) as a fresh ladder of treasury asks."""
+    with treasury["lock"]:
+        unlisted = int(platform_total_kg - treasury["ledger"].treasury_listed(TREASURY_OWNER))
+        if unlisted < MIN_TREASURY_LISTING:
+            return
+        for price, share in TREASURY_ASK_LADDER:
+            quantity = int(unlisted * share)
+            if quantity > 0:
+                treasury["book"].submit(SELL, quantity, price, owner=TREASURY_OWNER)
+
+def estimate_fill(book, quantity, limit_price):
+    """Walks the ask side to estimate (filled kg, gross ₹) for a buy order before submitting it."""
+    filled, value = 0, 0.0
+    for price, level_qty in book.depth(SELL, levels=len(TREASURY_ASK_LADDER) + 50):
+        if price > limit_price or filled >= quantity:
+            break
+        take = min(level_qty, quantity - filled)
+        filled += take
+        value += take * price
+    return filled, value
+
+@st.cache_resource
+def start_accrual_scheduler(_ledger):
+    """Starts the background thread that accrues every mandate month by month (once per server)."""
+    scheduler = AccrualScheduler(_ledger)
+    scheduler.start()
+    return scheduler
 
 # -----------------------------------------------------------------------------
 # 4. MAIN APP LAYOUT & SIP DASHBOARD
@@ -520,21 +591,22 @@ def get_project_image(ptype, seed=1):
 
 def main():
     # --- STATE INITIALIZATION ---
-    if 'sip_cart' not in st.session_state:
-        st.session_state.sip_cart = []
-        
-    if 'active_mandates' not in st.session_state:
-        st.session_state.active_mandates = []
-        
-    if 'total_carbon_offset' not in st.session_state:
-        st.session_state.total_carbon_offset = 0.0
+    # Cart, mandates and offsets are persisted in the SQLite ledger so they survive
+    # reconnects and restarts; `?user=<id>` in the URL selects whose ledger to show.
+    ledger = get_ledger()
+    start_accrual_scheduler(ledger)
+    start_image_prefetch()
+    user_id = st.query_params.get("user", DEFAULT_USER)
+    totals = ledger.totals(user_id)
         
     if 'initial_carbon' not in st.session_state:
         # Load user data upon initial boot
-        carb_kg, spend_amt, txns_count = load_user_footprint()
-        st.session_state.initial_carbon = carb_kg
-        st.session_state.total_spend = spend_amt
-        st.session_state.txn_count = txns_count
+        footprint = load_user_footprint()
+        st.session_state.footprint_status = footprint['status']
+        st.session_state.footprint_message = footprint['message']
+        st.session_state.initial_carbon = footprint['carbon_kg']
+        st.session_state.total_spend = footprint['total_spend']
+        st.session_state.txn_count = footprint['txn_count']
 
     # --- TOP NAVIGATION & CART ---
     col_logo, col_space = st.columns([8, 2])
@@ -542,61 +614,55 @@ def main():
         st.title("EcoInvest Mutual Funds")
         st.markdown("##### Earn Returns. Neutralize Carbon. Monthly SIPs.")
 
-    sip_count = len(st.session_state.sip_cart)
+    sip_count = totals['cart_count']
     
     # SIP MANDATE CART (Floating)
     with st.popover(f"💼 {sip_count}", help="View your Active SIP Mandates"):
         st.markdown("### Cart: Pending SIPs")
         
-        if not st.session_state.sip_cart:
+        if not sip_count:
             st.info("Your cart is empty. Start investing below.")
         else:
-            total_monthly_sip = 0
-            total_projected_carbon = 0
-            
-            for i, item in enumerate(st.session_state.sip_cart):
+            for item in ledger.cart(user_id):
                 with st.container():
                     c1, c2 = st.columns([3, 1])
                     with c1:
                         st.markdown(f"<span style='color:#10b981; font-weight:bold;'>{item['fund']}</span>", unsafe_allow_html=True)
-                        st.caption(f"SIP: ₹{item['amount']}/mo • IRR: {item['irr']}%")
+                        st.caption(f"SIP: ₹{item['amount']:,.0f}/mo • IRR: {item['irr']}%")
                     with c2:
-                        if st.button("❌", key=f"del_sip_{i}"):
-                            st.session_state.sip_cart.pop(i)
+                        if st.button("❌", key=f"del_sip_{item['id']}"):
+                            ledger.remove_from_cart(user_id, item['id'])
                             st.rerun()
-                total_monthly_sip += item['amount']
-                total_projected_carbon += (item['amount']/1000) * item['carbon_yield']
                 st.markdown("---")
             
-            st.metric("Total Monthly Auto-Pay", f"₹{total_monthly_sip:,.0f}")
-            st.success(f"Est. Monthly Impact: {total_projected_carbon:,.0f} kg CO₂e")
+            # Totals are maintained by the ledger on every insert/delete
+            st.metric("Total Monthly Auto-Pay", f"₹{totals['cart_monthly_amount']:,.0f}")
+            st.success(f"Est. Monthly Impact: {totals['cart_monthly_carbon']:,.0f} kg CO₂e")
             
             if st.button("Authorize E-Mandate", type="primary"):
-                # Move items from cart to active mandates, add to offset
-                for item in st.session_state.sip_cart:
-                    st.session_state.active_mandates.append(item)
-                    # Add monthly impact to our tracked offset
-                    st.session_state.total_carbon_offset += (item['amount']/1000) * item['carbon_yield']
-                
-                st.session_state.sip_cart = [] # Clear Cart
+                # Move items from cart to active mandates and book the first month's offset
+                ledger.authorize_cart(user_id)
                 st.success("Bank Mandate Authorized! Welcome to sustainable investing.")
                 st.balloons()
                 st.rerun()
                 
         # Show actively mandated SIPs below cart
-        if st.session_state.active_mandates:
+        if totals['mandate_count']:
             st.markdown("### Active Mandates")
-            for m in st.session_state.active_mandates:
-                st.caption(f"✅ **{m['fund']}**: ₹{m['amount']}/mo")
+            for m in ledger.mandates(user_id):
+                st.caption(f"✅ **{m['fund']}**: ₹{m['amount']:,.0f}/mo • {m['months_accrued']} mo paid • Value ₹{m['current_value']:,.0f}")
 
     st.markdown("---")
     
     # --- 1. PERSONAL CARBON LEDGER (NEW) ---
     st.subheader("🌍 Your Personal Carbon Ledger")
-    st.markdown(f"Based on **{st.session_state.txn_count}** tracked expenses from your uploaded CSV (Total Spend: **₹{st.session_state.total_spend:,.2f}**).")
+    if st.session_state.footprint_status == "ok":
+        st.markdown(f"Based on **{st.session_state.txn_count}** tracked expenses from your uploaded CSV (Total Spend: **₹{st.session_state.total_spend:,.2f}**).")
+    else:
+        st.warning(f"Baseline emissions unavailable ({st.session_state.footprint_status}): {st.session_state.footprint_message} Only SIP offsets are shown.")
     
     # Calculate Net Carbon based on Initial (CSV) - Offsets (from SIPs)
-    current_net_carbon = st.session_state.initial_carbon - st.session_state.total_carbon_offset
+    current_net_carbon = st.session_state.initial_carbon - totals['total_carbon_offset']
     
     # Optional safety so it doesn't show negative if heavily offset
     display_net_carbon = max(0, current_net_carbon)
@@ -605,12 +671,21 @@ def main():
     with dash_col1:
         st.metric("Baseline CO₂ Emissions", f"{st.session_state.initial_carbon:,.0f} kg", "From Tracked Expenses", delta_color="off")
     with dash_col2:
-        st.metric("Active SIP Offsets", f"{st.session_state.total_carbon_offset:,.0f} kg", "From Mutual Funds", delta_color="normal")
+        st.metric("Active SIP Offsets", f"{totals['total_carbon_offset']:,.0f} kg", "From Mutual Funds", delta_color="normal")
     with dash_col3:
-        st.metric("Net Carbon Footprint", f"{display_net_carbon:,.0f} kg", f"-{st.session_state.total_carbon_offset:,.0f} kg reduced", delta_color="inverse")
+        st.metric("Net Carbon Footprint", f"{display_net_carbon:,.0f} kg", f"-{totals['total_carbon_offset']:,.0f} kg reduced", delta_color="inverse")
         
     if display_net_carbon == 0 and st.session_state.initial_carbon > 0:
         st.success("🎉 Incredible! Your authorized SIPs have completely neutralized your tracked carbon footprint!")
+    
+    if totals['mandate_count']:
+        with st.expander("⏩ Replay Elapsed Months (Accrual Simulator)", expanded=False):
+            st.caption("Mandates accrue automatically every month. Fast-forward to see how your offsets and fund value build up.")
+            replay_months = st.number_input("Months to catch up", min_value=1, max_value=120, value=12, step=1)
+            if st.button("Run Monthly Accrual"):
+                result = ledger.accrue(months=replay_months, user_id=user_id)
+                st.success(f"Accrued {result['months']} mandate-months • +{result['carbon_kg']:,.0f} kg CO₂e offset")
+                st.rerun()
         
     st.markdown("---")
 
@@ -636,12 +711,14 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.button("Add to SIP Mandate Cart"):
-            st.session_state.sip_cart.append({
-                "fund": fund_data['name'],
-                "amount": sip_amount,
-                "irr": fund_data['irr'],
-                "carbon_yield": fund_data['carbon_yield_per_1k']
-            })
+            ledger.add_to_cart(
+                user_id,
+                portfolio=selected_calc_fund,
+                fund=fund_data['name'],
+                amount=sip_amount,
+                irr=fund_data['irr'],
+                carbon_yield=fund_data['carbon_yield_per_1k']
+            )
             st.success(f"Added ₹{sip_amount}/mo SIP to cart.")
             st.rerun() # Refresh to update cart count instantly
         st.markdown('</div>', unsafe_allow_html=True)
@@ -674,6 +751,24 @@ def main():
         )
         st.plotly_chart(fig_carb, use_container_width=True)
 
+    # --- 2b. SCENARIO SENSITIVITY HEATMAP ---
+    st.markdown("#### 🧮 What-If Sensitivity: Amount × Tenure")
+    st.markdown("Every combination of monthly amount and tenure for each fund, computed in a single pass.")
+    
+    heat_metric = st.radio("Heatmap Metric", ["Projected Wealth", "Cumulative Carbon Reduced"], horizontal=True)
+    scenario_amounts = list(range(1000, 50001, 2500))
+    scenario_tenures = list(range(1, 16))
+    scenarios = run_sip_scenarios(scenario_amounts, scenario_tenures, PORTFOLIOS.keys())
+    
+    heat_tabs = st.tabs(list(PORTFOLIOS.keys()))
+    for heat_tab, (p_key, grid) in zip(heat_tabs, scenarios.items()):
+        with heat_tab:
+            if heat_metric == "Projected Wealth":
+                fig_heat = plot_scenario_heatmap(grid['future_value'], scenario_amounts, scenario_tenures, "Projected Wealth", prefix="₹")
+            else:
+                fig_heat = plot_scenario_heatmap(grid['carbon'], scenario_amounts, scenario_tenures, "CO₂ Reduced", suffix=" kg")
+            st.plotly_chart(fig_heat, use_container_width=True)
+
     st.markdown("---")
 
     # --- 3. FUND SELECTION BROWSER ---
@@ -722,100 +817,90 @@ def main():
             list(PORTFOLIOS.keys()),
             default=list(PORTFOLIOS.keys())
         )
+    with f_col2:
+        sort_options = {
+            "Default": (None, False),
+            "Rating (Best First)": ("rating", False),
+            "Price / Tonne (High to Low)": ("price_per_tonne", True),
+            "Price / Tonne (Low to High)": ("price_per_tonne", False),
+            "Newest Vintage": ("vintage", True),
+            "Most Funded": ("funded_percent", True),
+        }
+        sort_choice = st.selectbox("Sort Assets", list(sort_options.keys()))
+
+    with st.expander("Advanced Asset Filters", expanded=False):
+        a_col1, a_col2, a_col3, a_col4 = st.columns(4)
+        sel_registries = a_col1.multiselect("Registry", CATALOG.distinct("registry"))
+        sel_ratings = a_col2.multiselect("Rating", CATALOG.distinct("rating"))
+        sel_vintages = a_col3.multiselect("Vintage", CATALOG.distinct("vintage"))
+        sel_sdgs = a_col4.multiselect("UN SDG", CATALOG.distinct("sdg"))
     
-    # Map logic retained strictly for LOC and structural integrity
-    filtered_projects = [p for p in PROJECTS if p['type'] in selected_portfolios]
+    # Empty advanced selections mean "no filter" on that field
+    sort_field, sort_desc = sort_options[sort_choice]
+    project_rows = CATALOG.query(
+        sort_by=sort_field, descending=sort_desc,
+        type=selected_portfolios,
+        registry=sel_registries or None, rating=sel_ratings or None,
+        vintage=sel_vintages or None, sdg=sel_sdgs or None,
+    )
+    filtered_projects = CATALOG.records(project_rows)
     
     if filtered_projects:
-        map_df = pd.DataFrame(filtered_projects)
-        fig_map = px.scatter_geo(
-            map_df,
-            lat='lat',
-            lon='lon',
-            color='type',
-            hover_name='name',
-            size='price_per_tonne',
-            projection="natural earth",
-            title="Global Asset Mapping",
-            color_discrete_map={
-                "Reforestation": "#15803d", 
-                "Solar Energy": "#d97706", 
-                "Rural Biogas": "#7e22ce", 
-                "EV Charging": "#2563eb"
-            }
-        )
-        fig_map.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            geo=dict(bgcolor="rgba(0,0,0,0)", showland=True, landcolor="#1e293b", showocean=True, oceancolor="#0f172a"),
-            font_color="white", margin=dict(l=0, r=0, t=30, b=0), height=350
-        )
+        fig_map = get_asset_map(tuple(np.sort(project_rows).tolist()))
         st.plotly_chart(fig_map, use_container_width=True)
     else:
         st.warning("Select a portfolio to view underlying assets.")
 
     # Project List Maintained for LOC
     st.subheader("📋 Asset Ledger")
-    st.markdown(f"Displaying {len(filtered_projects)} physical assets currently held across selected funds.")
+    
+    # Only the current page of cards is built and sent to the browser
+    pg_col1, pg_col2, pg_col3 = st.columns([1, 1, 2])
+    with pg_col1:
+        page_size = st.selectbox("Assets per Page", LEDGER_PAGE_SIZES, index=LEDGER_PAGE_SIZES.index(DEFAULT_LEDGER_PAGE_SIZE))
+    total_pages = max(1, math.ceil(len(project_rows) / page_size))
+    if st.session_state.get('ledger_page', 1) > total_pages:
+        st.session_state.ledger_page = total_pages
+    with pg_col2:
+        page = st.number_input("Page", min_value=1, max_value=total_pages, step=1, key="ledger_page")
+    
+    page_start = (page - 1) * page_size
+    page_projects = CATALOG.records(project_rows[page_start:page_start + page_size])
+    with pg_col3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.caption(f"Page {page} of {total_pages}")
+    st.markdown(f"Displaying {len(page_projects)} of {len(filtered_projects)} physical assets currently held across selected funds.")
 
     cols = st.columns(2)
-    for idx, project in enumerate(filtered_projects):
+    for idx, project in enumerate(page_projects):
         col = cols[idx % 2]
         with col:
-            badge_cls = get_badge_class(project['type'])
-            img_url = get_project_image(project['type'], seed=project['id'])
-            
-            card_html = textwrap.dedent(f"""
-            <div class="project-card-container">
-            <img src="{img_url}" class="project-image" alt="{project['name']}">
-            <div class="card-content">
-            <div>
-            <h3 class="project-title">{project['name']}</h3>
-            <div>
-            <span class="badge {badge_cls}">{project['type']} Fund Asset</span>
-            <span class="meta-tag">🛡️ {project['registry']}</span>
-            </div>
-            <p style="color:#94a3b8; font-size:0.85rem; margin: 8px 0;">📍 {project['location']}</p>
-            <p class="project-desc">{project['description']}</p>
-            <div style="display:flex; gap:6px; flex-wrap:wrap; margin-top: auto;">
-            <span class="meta-tag">🇺🇳 SDGs: {', '.join(project['sdgs'])}</span>
-            <span class="meta-tag">📅 Vintage: {project['vintage']}</span>
-            <span class="meta-tag">⭐ {project['rating']}</span>
-            </div>
-            </div>
-            <div class="price-section">
-            <div>
-            <span style="font-size:1.4rem; font-weight:bold; color:#38bdf8;">Asset Value</span>
-            <span style="color:#94a3b8; font-size:0.8rem;"><br>High Liquidity</span>
-            </div>
-            <div style="text-align:right;">
-            <span style="font-size:0.8rem; color:#94a3b8;">Fund Allocation Cap</span><br>
-            <span style="font-weight:bold; color:#10b981;">{project['funded_percent']}%</span>
-            </div>
-            </div>
-            </div>
-            </div>
-            """)
-            st.markdown(card_html, unsafe_allow_html=True)
+            st.markdown(render_project_card(project['id']), unsafe_allow_html=True)
             
             # --- ROI SLIDER ADDITION ---
             # Extract base IRR from the PORTFOLIOS logic based on type
             base_irr = PORTFOLIOS[project['type']]['irr']
             
-            with st.expander(f"📊 Calculate ROI for {project['name']}", expanded=False):
+            # A toggle instead of an expander: expander bodies execute even when
+            # collapsed, so the calculator widgets are only built once opened.
+            if st.toggle(f"📊 Calculate ROI for {project['name']}", key=f"roi_open_{project['id']}"):
                 inv_amt = st.slider(
                     "Simulated Investment Amount (₹)", 
-                    min_value=1000, max_value=250000, value=25000, step=5000, 
+                    min_value=ROI_MIN_AMOUNT, max_value=int(ROI_AMOUNTS[-1]), value=26000, step=ROI_STEP, 
                     key=f"inv_slider_{project['id']}"
                 )
+                duration_yrs = st.radio(
+                    "Holding Period", ROI_DURATIONS, index=ROI_DURATIONS.index(5), horizontal=True,
+                    format_func=lambda y: f"{y} Yr" if y == 1 else f"{y} Yrs", key=f"roi_years_{project['id']}"
+                )
                 
-                # Compound interest formula: A = P(1 + r/n)^(nt) where n=1 (annually), t=5 years
-                duration_yrs = 5
-                projected_return = inv_amt * ((1 + (base_irr/100)) ** duration_yrs)
+                # Compound interest A = P(1 + r)^t, precomputed for every slider position and period
+                projected_return = lookup_roi(project['type'], inv_amt, duration_yrs)
                 net_profit = projected_return - inv_amt
                 
                 st.markdown(f"**Target Rate of Return:** <span style='color:#fbbf24'>{base_irr}% Annual (IRR)</span>", unsafe_allow_html=True)
                 r_col1, r_col2 = st.columns(2)
-                r_col1.metric("Projected Value (5 Yrs)", f"₹{projected_return:,.0f}")
+                r_col1.metric(f"Projected Value ({duration_yrs} Yrs)", f"₹{projected_return:,.0f}")
                 r_col2.metric("Net Gain", f"+₹{net_profit:,.0f}", f"+{(net_profit/inv_amt)*100:.1f}%")
 
     # --- 5. ECOPAY B2B CREDIT GAINER ---
@@ -826,39 +911,92 @@ def main():
     generating foundational platform revenue for Ecopay.
     """)
     
-    # Simulated Treasury Aggregation Data
-    total_platform_credits = 2450000  # Total kg generated via platform SIPs
-    credits_previously_sold = 1150000
-    available_credits = total_platform_credits - credits_previously_sold
-    current_market_price = 1.45 # ₹ per kg Spot Price
+    # Platform credits are the running total of every user's accrued offsets (kept by
+    # ledger triggers); the treasury lists new credits on an order book saved in the ledger.
+    treasury = get_treasury(ledger)
+    book = treasury["book"]
+    total_platform_credits = ledger.platform_total()
+    list_new_treasury_credits(treasury, total_platform_credits)
+    credits_previously_sold = ledger.platform_sold()
+    available_credits = int(ledger.treasury_listed(TREASURY_OWNER) - credits_previously_sold)
+    current_market_price = book.last_price() or book.best_ask() or REFERENCE_SPOT_PRICE
+    price_change = current_market_price - REFERENCE_SPOT_PRICE
     
     t_col1, t_col2, t_col3 = st.columns(3)
     t_col1.metric("Total User SIP Credits (kg)", f"{total_platform_credits:,.0f}")
     t_col2.metric("Treasury Block Available (kg)", f"{available_credits:,.0f}", delta="Ready for B2B Sale")
-    t_col3.metric("Current Market Spot Price", f"₹{current_market_price:,.2f} / kg", delta="+₹0.12 (8.4%) from last week")
+    t_col3.metric("Current Market Spot Price", f"₹{current_market_price:,.2f} / kg", delta=f"{price_change:+.2f} ₹ vs last settlement")
+    
+    platform_breakdown = ledger.platform_credits()
+    if platform_breakdown:
+        credits_df = pd.DataFrame(platform_breakdown)
+        fig_credits = px.bar(
+            credits_df, x='vintage', y='carbon_kg', color='portfolio', barmode='stack',
+            hover_data=['sold_kg'],
+            color_discrete_map={"Reforestation": "#15803d", "Solar Energy": "#d97706", "Rural Biogas": "#7e22ce", "EV Charging": "#2563eb"},
+            labels={'vintage': 'Vintage', 'carbon_kg': 'Credits (kg CO₂e)', 'portfolio': 'Portfolio', 'sold_kg': 'Sold to B2B (kg)'}
+        )
+        fig_credits.update_layout(
+            title="Platform Credits by Portfolio & Vintage", paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+            font_color="white", height=260, margin=dict(l=0, r=0, t=30, b=0)
+        )
+        st.plotly_chart(fig_credits, use_container_width=True)
     
     st.markdown("#### Execute Wholesale Block Trade")
     st.markdown("<div class='filter-container'>", unsafe_allow_html=True)
+    if available_credits < MIN_TREASURY_LISTING:
+        st.info("No treasury credits are listed yet. Blocks are listed as user mandates accrue offsets; bids placed now rest on the book.")
     b2b_col1, b2b_col2 = st.columns([2, 1])
     
     with b2b_col1:
         buyer = st.selectbox(
             "Select Corporate Buyer (Pending ESG Audits)", 
-            ["Microsoft India", "Tata Motors", "Infosys Limited", "Reliance Industries", "Amazon AWS India"]
+            CORPORATE_BUYERS
         )
+        # Bids above the listed block are allowed; the excess rests on the book
+        volume_max = max(available_credits // MIN_TREASURY_LISTING * MIN_TREASURY_LISTING, 50 * MIN_TREASURY_LISTING)
         sell_amount = st.slider(
             "Volume to Liquidate (kg CO₂e)", 
-            min_value=50000, max_value=available_credits, value=250000, step=25000
+            min_value=MIN_TREASURY_LISTING, max_value=volume_max, value=min(250000, volume_max), step=MIN_TREASURY_LISTING
+        )
+        limit_price = st.number_input(
+            "Buyer Limit Price (₹ / kg)", min_value=0.5, max_value=5.0,
+            value=float(book.best_ask() or REFERENCE_SPOT_PRICE), step=0.05, format="%.2f"
         )
         
     with b2b_col2:
         st.markdown("<br>", unsafe_allow_html=True) # Spacer
-        trade_value = sell_amount * current_market_price
+        est_filled, trade_value = estimate_fill(book, sell_amount, limit_price)
         st.info(f"**Gross Trade Value:** \n### ₹{trade_value:,.0f}")
+        if est_filled < sell_amount:
+            st.caption(f"Only {est_filled:,.0f} kg available at or below ₹{limit_price:.2f}; the rest will rest as a bid.")
         
         if st.button("EXECUTE B2B SALE", type="primary", use_container_width=True):
-            st.success(f"✅ Success! Executed block trade of {sell_amount:,.0f} kg to {buyer}.")
-            st.balloons()
+            try:
+                order, trades = book.submit(BUY, sell_amount, limit_price, owner=buyer)
+            except sqlite3.Error as e:
+                # Nothing was matched: the book is rolled back when the ledger write fails
+                st.error(f"Trade not executed, the ledger could not be updated: {e}")
+            else:
+                filled = sell_amount - order.remaining
+                if filled:
+                    avg_price = sum(t['price'] * t['quantity'] for t in trades) / filled
+                    st.success(f"✅ Success! Executed block trade of {filled:,.0f} kg to {buyer} at avg ₹{avg_price:.2f}/kg across {len(trades)} fill(s).")
+                    st.balloons()
+                if order.remaining:
+                    st.warning(f"{order.remaining:,.0f} kg unfilled at ₹{limit_price:.2f}/kg is resting on the book as a bid.")
+    
+    with st.expander("📒 Order Book & Trade Log", expanded=False):
+        ob_col1, ob_col2 = st.columns(2)
+        with ob_col1:
+            st.markdown("**Asks (Treasury Offers)**")
+            st.dataframe(pd.DataFrame(book.depth(SELL, levels=10), columns=["Price (₹/kg)", "Quantity (kg)"]), hide_index=True, use_container_width=True)
+            st.markdown("**Bids (Corporate Demand)**")
+            st.dataframe(pd.DataFrame(book.depth(BUY, levels=10), columns=["Price (₹/kg)", "Quantity (kg)"]), hide_index=True, use_container_width=True)
+        with ob_col2:
+            st.markdown("**Recent Trades**")
+            recent = pd.DataFrame(book.trades[-10:][::-1], columns=["trade_id", "buyer", "price", "quantity"])
+            st.dataframe(recent, hide_index=True, use_container_width=True)
             
     st.markdown("</div>", unsafe_allow_html=True)
 
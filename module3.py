@@ -6,6 +6,12 @@ import json
 import os
 from groq import Groq
 
+from conversation_memory import ConversationMemory
+from profile_extractor import (
+    ProfileExtractor, format_user_data, COMMUTE_OPTIONS, FLIGHT_OPTIONS, DIET_OPTIONS,
+    FOOD_SOURCE_OPTIONS, HOME_OPTIONS, ENERGY_OPTIONS, FASHION_OPTIONS, TECH_OPTIONS
+)
+
 # -----------------------------------------------------------------------------
 # 1. PAGE CONFIGURATION & STYLING
 # -----------------------------------------------------------------------------
@@ -224,6 +230,34 @@ def chat_with_assistant(messages):
     except Exception as e:
         return f"System Offline: Unable to process the request due to {str(e)}."
 
+def resolve_profile_fields(fields, question, answer):
+    """
+    Small-model fallback for chat answers the local patterns couldn't place.
+    `fields` maps each unresolved profile field to its allowed values.
+    """
+    client = get_groq_client()
+    if not client:
+        return {}
+
+    prompt = f"""
+    Map the user's answer to the lifestyle profile fields below. The answer may be in any Indian language.
+    Return ONLY a JSON object containing the fields the answer clearly states, nothing else.
+    Each value must be exactly one of the allowed options; "int" means weekly commute distance in km
+    as a number, "bool" means true/false for heavy air conditioning / heating use.
+
+    Coach question: {question}
+    User answer: {answer}
+    Fields and allowed values: {json.dumps(fields, ensure_ascii=False)}
+    """
+    response = client.chat.completions.create(
+        model="llama-3.1-8b-instant",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0,
+        max_tokens=200,
+        response_format={"type": "json_object"}
+    )
+    return json.loads(response.choices[0].message.content)
+
 def get_mock_response():
     """Provides structured realistic data if Groq API fails or key is missing."""
     return {
@@ -304,6 +338,10 @@ def chat_popup():
     if prompt:
         # Add user message
         st.session_state.messages.append({"role": "user", "content": prompt})
+        # Pick profile answers out of this turn; they also feed the memory summary
+        extractor = st.session_state.profile_extractor
+        extractor.update_from_messages(st.session_state.messages)
+        st.session_state.chat_memory.facts = extractor.profile.filled()
         with chat_container:
             with st.chat_message("user"):
                 st.markdown(prompt)
@@ -312,7 +350,8 @@ def chat_popup():
         with chat_container:
             with st.chat_message("assistant"):
                 with st.spinner("Thinking..."):
-                    api_messages = [{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
+                    # Recent turns verbatim plus a summary of older answers, within the token budget
+                    api_messages = st.session_state.chat_memory.build(st.session_state.messages)
                     response = chat_with_assistant(api_messages)
                     st.markdown(response)
         
@@ -343,23 +382,34 @@ def main():
         st.session_state.messages = [
             {"role": "assistant", "content": "नमस्ते! Namaste! Hello! I am your Eco-FinTech Assistant. I will ask you 10 simple questions to track your carbon footprint. In which language would you like to proceed?"}
         ]
+    if "chat_memory" not in st.session_state:
+        st.session_state.chat_memory = ConversationMemory()
+    if "profile_extractor" not in st.session_state:
+        st.session_state.profile_extractor = ProfileExtractor(resolve=resolve_profile_fields)
+    chat_profile = st.session_state.profile_extractor.profile
+
+    def chat_default(options, field):
+        """Form default: the chat's answer when there is one, else the first option."""
+        value = getattr(chat_profile, field)
+        return options.index(value) if value in options else 0
 
     # --- MAIN DASHBOARD LAYOUT ---
     st.markdown("<div class='glass-card'>", unsafe_allow_html=True)
     st.markdown("### 📋 Complete Your Comprehensive Eco-Profile")
     st.markdown("<hr style='border-color: rgba(255,255,255,0.1); margin: 15px 0;'>", unsafe_allow_html=True)
     
-    user_data = {}
+    chat_answers = len(chat_profile.filled())
+    if chat_answers:
+        st.caption(f"💬 {chat_answers} of 10 answers were picked up from your chat with the AI Coach and pre-filled below.")
     
     # 1. Transport Section
     st.markdown("<h4 style='color:#00d26a;'>🚗 Transportation Habits</h4>", unsafe_allow_html=True)
     t_c1, t_c2 = st.columns(2)
     with t_c1:
-        commute_type = st.selectbox("Primary Commute Method", ["Gas/Petrol Car", "Diesel Car", "Hybrid Car", "EV", "Motorcycle", "Public Transit", "Bicycle/Walking"])
+        commute_type = st.selectbox("Primary Commute Method", COMMUTE_OPTIONS, index=chat_default(COMMUTE_OPTIONS, "commute_type"))
     with t_c2:
-        flights = st.selectbox("Air Travel (Annual)", ["None", "1-2 Short Flights", "3-5 Flights", "Frequent Flyer (6+ flights)", "Long-Haul International"])
-    weekly_miles = st.slider("Weekly Commute Distance (Miles/Km equivalent)", 0, 500, 100)
-    user_data['transport'] = f"Method: {commute_type}, Distance: {weekly_miles}/wk, Flights: {flights}"
+        flights = st.selectbox("Air Travel (Annual)", FLIGHT_OPTIONS, index=chat_default(FLIGHT_OPTIONS, "flights"))
+    weekly_miles = st.slider("Weekly Commute Distance (Miles/Km equivalent)", 0, 500, chat_profile.weekly_distance if chat_profile.weekly_distance is not None else 100)
     
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -367,10 +417,9 @@ def main():
     st.markdown("<h4 style='color:#00d26a;'>🥗 Diet Patterns</h4>", unsafe_allow_html=True)
     d_c1, d_c2 = st.columns(2)
     with d_c1:
-        diet_type = st.selectbox("Primary Diet", ["Heavy Meat Eater (Daily)", "Average (Meat 3-4x/week)", "Pescatarian", "Vegetarian", "Vegan"])
+        diet_type = st.selectbox("Primary Diet", DIET_OPTIONS, index=chat_default(DIET_OPTIONS, "diet_type"))
     with d_c2:
-        food_source = st.selectbox("Food Sourcing", ["Mostly Supermarket (Imported)", "Mix of Supermarket & Local", "Mostly Local/Farmers Market"])
-    user_data['diet'] = f"Type: {diet_type}, Sourcing: {food_source}"
+        food_source = st.selectbox("Food Sourcing", FOOD_SOURCE_OPTIONS, index=chat_default(FOOD_SOURCE_OPTIONS, "food_source"))
     
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -378,11 +427,10 @@ def main():
     st.markdown("<h4 style='color:#00d26a;'>⚡ Energy Consumption</h4>", unsafe_allow_html=True)
     e_c1, e_c2 = st.columns(2)
     with e_c1:
-        home_type = st.selectbox("Home Type", ["Apartment (1-2 beds)", "Medium House (3 beds)", "Large House (4+ beds)"])
-        hvac = st.checkbox("Heavy Air Conditioning / Heating Usage", value=True)
+        home_type = st.selectbox("Home Type", HOME_OPTIONS, index=chat_default(HOME_OPTIONS, "home_type"))
+        hvac = st.checkbox("Heavy Air Conditioning / Heating Usage", value=chat_profile.hvac if chat_profile.hvac is not None else True)
     with e_c2:
-        energy_source = st.selectbox("Energy Grid Setup", ["Standard Grid (Fossil Heavy)", "Mixed Grid", "100% Renewable Tariff / Solar"])
-    user_data['energy'] = f"Home: {home_type}, Heavy HVAC: {hvac}, Source: {energy_source}"
+        energy_source = st.selectbox("Energy Grid Setup", ENERGY_OPTIONS, index=chat_default(ENERGY_OPTIONS, "energy_source"))
 
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -390,16 +438,29 @@ def main():
     st.markdown("<h4 style='color:#00d26a;'>🛍️ Shopping Behavior</h4>", unsafe_allow_html=True)
     s_c1, s_c2 = st.columns(2)
     with s_c1:
-        fashion = st.selectbox("Clothing Purchases", ["Frequent Fast Fashion", "Occasional Mainstream Brands", "Mostly Second-hand/Thrift", "Sustainable Brands Only"])
+        fashion = st.selectbox("Clothing Purchases", FASHION_OPTIONS, index=chat_default(FASHION_OPTIONS, "fashion"))
     with s_c2:
-        tech = st.selectbox("Tech Replacement Rate", ["Upgrade yearly", "Upgrade every 2-3 years", "Use until broken"])
-    user_data['shopping'] = f"Fashion: {fashion}, Tech: {tech}"
-
-    # Generate Report Button
-    if st.button("Generate AI Intelligence Report 🚀"):
-        with st.spinner("Initializing Groq AI... Crunching your ecosystem data..."):
-            st.session_state.report_data = generate_eco_profile(user_data)
-            st.session_state.report_generated = True
+        tech = st.selectbox("Tech Replacement Rate", TECH_OPTIONS, index=chat_default(TECH_OPTIONS, "tech"))
+
+    user_data = format_user_data(
+        commute_type=commute_type, weekly_distance=weekly_miles, flights=flights,
+        diet_type=diet_type, food_source=food_source,
+        home_type=home_type, hvac=hvac, energy_source=energy_source,
+        fashion=fashion, tech=tech
+    )
+
+    # Generate Report Buttons: from the form, or straight from what the chat collected
+    g_c1, g_c2 = st.columns(2)
+    with g_c1:
+        if st.button("Generate AI Intelligence Report 🚀"):
+            with st.spinner("Initializing Groq AI... Crunching your ecosystem data..."):
+                st.session_state.report_data = generate_eco_profile(user_data)
+                st.session_state.report_generated = True
+    with g_c2:
+        if st.button("Generate Report from Chat 💬", disabled=not chat_answers):
+            with st.spinner("Building your report from the chat answers..."):
+                st.session_state.report_data = generate_eco_profile(chat_profile.to_user_data())
+                st.session_state.report_generated = True
 
     st.markdown("</div>", unsafe_allow_html=True) # End form glass card
 
@@ -0,0 +1,290 @@
+import re
+
+# -----------------------------------------------------------------------------
+# INCREMENTAL ECO-PROFILE EXTRACTION FROM THE CHAT COACH
+# -----------------------------------------------------------------------------
+# Every answer in the coach chat is matched against keyword patterns for the
+# fields of the Eco-Profile form (English plus common Hindi words). The field
+# the coach just asked about is resolved first; anything else the user
+# volunteers is picked up too. Only when the asked-about field can't be matched
+# locally (or the question couldn't be placed at all) is a small LLM consulted,
+# through a caller-supplied `resolve` function, and only for the missing fields.
+
+COMMUTE_OPTIONS = ["Gas/Petrol Car", "Diesel Car", "Hybrid Car", "EV", "Motorcycle", "Public Transit", "Bicycle/Walking"]
+FLIGHT_OPTIONS = ["None", "1-2 Short Flights", "3-5 Flights", "Frequent Flyer (6+ flights)", "Long-Haul International"]
+DIET_OPTIONS = ["Heavy Meat Eater (Daily)", "Average (Meat 3-4x/week)", "Pescatarian", "Vegetarian", "Vegan"]
+FOOD_SOURCE_OPTIONS = ["Mostly Supermarket (Imported)", "Mix of Supermarket & Local", "Mostly Local/Farmers Market"]
+HOME_OPTIONS = ["Apartment (1-2 beds)", "Medium House (3 beds)", "Large House (4+ beds)"]
+ENERGY_OPTIONS = ["Standard Grid (Fossil Heavy)", "Mixed Grid", "100% Renewable Tariff / Solar"]
+FASHION_OPTIONS = ["Frequent Fast Fashion", "Occasional Mainstream Brands", "Mostly Second-hand/Thrift", "Sustainable Brands Only"]
+TECH_OPTIONS = ["Upgrade yearly", "Upgrade every 2-3 years", "Use until broken"]
+MAX_WEEKLY_DISTANCE = 500
+
+# Field -> allowed values (a list of options, or "int" / "bool")
+PROFILE_FIELDS = {
+    "commute_type": COMMUTE_OPTIONS,
+    "weekly_distance": "int",
+    "flights": FLIGHT_OPTIONS,
+    "diet_type": DIET_OPTIONS,
+    "food_source": FOOD_SOURCE_OPTIONS,
+    "home_type": HOME_OPTIONS,
+    "hvac": "bool",
+    "energy_source": ENERGY_OPTIONS,
+    "fashion": FASHION_OPTIONS,
+    "tech": TECH_OPTIONS,
+}
+
+NOT_STATED = "Not stated"
+
+
+def _rx(*patterns):
+    return re.compile("|".join(patterns), re.IGNORECASE)
+
+
+def _deva(*words):
+    """
+    Whole-word pattern for Devanagari words. `\\b` is unreliable around matras
+    and viramas, so any Devanagari character on either side counts as being
+    inside a longer word ("कार" must not match "कार्बन" or "सरकार").
+    """
+    return r"(?<![\u0900-\u097F])(?:" + "|".join(words) + r")(?![\u0900-\u097F])"
+
+
+# Which field(s) a coach question is about
+QUESTION_TOPICS = {
+    "commute_type": _rx(r"\bcommut", r"\btravel to", r"\bget to (work|college|office)", r"\btransport", r"\bvehicle"),
+    "weekly_distance": _rx(r"\bdistance", r"\bhow far", r"\bkilomet", r"\bkms?\b", r"\bmiles"),
+    "flights": _rx(r"\bfl(y|ight|ew)", r"\bair travel", r"\bplane"),
+    "diet_type": _rx(r"\bdiet", r"\beat\b", r"\bmeat", r"\bvegetarian", r"\bmeals?\b"),
+    "food_source": _rx(r"\bgrocer", r"\b(buy|get|source) (your )?(food|vegetables|produce)", r"\blocal(ly)? (market|produce|grown)", r"\bsupermarket"),
+    "home_type": _rx(r"\b(type of|size of|kind of) (home|house)", r"\blive in an?\b", r"\bapartment", r"\bbhk\b", r"\bbedrooms?"),
+    "hvac": _rx(r"\bair[- ]?condition", r"\bac\b", r"\bheating", r"\bheater", r"\bcooling"),
+    "energy_source": _rx(r"\belectricity", r"\benergy (source|supply)", r"\bsolar", r"\brenewable", r"\bpower (come|source|supply)"),
+    "fashion": _rx(r"\bcloth", r"\bfashion", r"\bapparel", r"\bshopping"),
+    "tech": _rx(r"\bphones?\b", r"\bgadget", r"\blaptop", r"\belectronics", r"\bupgrade", r"\bdevices?\b"),
+}
+
+# Field -> [(pattern, value, targeted_only)], first match wins. Targeted-only
+# rules (bare "no", "yes", numbers) only apply when the coach asked about that field.
+# Ambiguous Hindi words are left out on purpose (बस is also "enough" / "just",
+# घर is any home) so such answers go to the LLM fallback instead.
+FIELD_RULES = {
+    "commute_type": [
+        (_rx(r"\bev\b", r"\belectric (car|vehicle|scooter|bike)", _deva("इलेक्ट्रिक")), "EV", False),
+        (_rx(r"\bhybrid\b"), "Hybrid Car", False),
+        (_rx(r"\bdiesel\b", _deva("डीजल")), "Diesel Car", False),
+        (_rx(r"\b(bi)?cycl(e|ing)\b", r"\bwalk(ing)?\b", r"\bon foot\b", _deva("साइकिल", "पैदल")), "Bicycle/Walking", False),
+        (_rx(r"\b(motor ?bike|motorcycle|bike|scooter|scooty|two[- ]wheeler)\b", _deva("बाइक", "स्कूटर")), "Motorcycle", False),
+        (_rx(r"\b(metro|bus|train|local train|public transport|transit|subway|auto|rickshaw|cab|shared)\b", _deva("मेट्रो", "ट्रेन", "ऑटो")), "Public Transit", False),
+        (_rx(r"\b(petrol|gas(oline)?|car|drive|driving|sedan|suv)\b", _deva("कार", "गाड़ी", "पेट्रोल")), "Gas/Petrol Car", False),
+    ],
+    "flights": [
+        (_rx(r"\b(international|abroad|overseas|long[- ]haul)\b", _deva("विदेश")), "Long-Haul International", False),
+        (_rx(r"\b(frequent(ly)?|every month|monthly|every week|weekly)\b.{0,20}\bfl(y|ights?)", r"\bfrequent flyer\b"), "Frequent Flyer (6+ flights)", False),
+        (_rx(r"\b(never|don'?t|do not|rarely if ever)\b.{0,10}\bfly\b", r"\bno flights?\b"), "None", False),
+        (_rx(r"^\s*(no|none|never|zero|0|nahi)\b", r"^\s*" + _deva("नहीं")), "None", True),
+    ],
+    "diet_type": [
+        (_rx(r"\bvegan\b", _deva("वीगन")), "Vegan", False),
+        (_rx(r"\b(no|don'?t eat|do not eat|never eat|avoid)\s+(any\s+)?(meat|non[- ]?veg)", _deva("शाकाहारी")), "Vegetarian", False),
+        # Vegetarians who eat eggs ("eggetarian") are still vegetarian, not meat eaters
+        (_rx(r"\beggetarian\b", r"(?<!non)(?<!non-)(?<!non )\b(veg|vegetarian|veggie)\b.{0,40}\beggs?\b",
+             r"\beggs?\b.{0,40}(?<!non)(?<!non-)(?<!non )\b(veg|vegetarian|veggie)\b"), "Vegetarian", False),
+        (_rx(r"\b(daily|every ?day|every meal|all the time)\b.{0,30}\b(meat|chicken|mutton|beef|pork|non[- ]?veg)",
+             r"\b(meat|chicken|mutton|beef|pork|non[- ]?veg)\b.{0,30}\b(daily|every ?day|every meal)\b"), "Heavy Meat Eater (Daily)", False),
+        (_rx(r"\b(meat|chicken|mutton|beef|pork|non[- ]?veg(etarian)?|eggs?)\b", _deva("मांसाहारी", "नॉन[- ]?वेज")), "Average (Meat 3-4x/week)", False),
+        (_rx(r"\b(pescatarian|fish|seafood)\b", _deva("मछली")), "Pescatarian", False),
+        (_rx(r"\b(vegetarian|veg|veggie|jain)\b"), "Vegetarian", False),
+    ],
+    "food_source": [
+        (_rx(r"\b(both|mix|mixed|combination)\b"), "Mix of Supermarket & Local", True),
+        (_rx(r"\b(local|farmers?'? ?market|sabzi ?(wala|mandi)?|mandi|vendors?|home[- ]?grown|kirana)\b", _deva("मंडी", "सब्ज़ी")), "Mostly Local/Farmers Market", False),
+        (_rx(r"\b(supermarket|big ?basket|blinkit|zepto|instamart|online|imported|d-?mart|mall)\b"), "Mostly Supermarket (Imported)", False),
+    ],
+    "home_type": [
+        (_rx(r"\b([4-9] ?bhk|villa|bungalow|large house|big house|farmhouse)\b"), "Large House (4+ beds)", False),
+        (_rx(r"\b(apartment|flat|[12] ?bhk|1 ?rk|studio|pg|hostel)\b", _deva("फ्लैट")), "Apartment (1-2 beds)", False),
+        (_rx(r"\b(3 ?bhk|house|independent house)\b", _deva("मकान")), "Medium House (3 beds)", False),
+    ],
+    "hvac": [
+        (_rx(r"\b(no|don'?t|do not|never|rarely|without)\b.{0,20}\b(ac|a/c|air[- ]?condition\w*|heater|heating)\b"), False, False),
+        (_rx(r"\b(ac|a/c|air[- ]?condition\w*|heater|heating)\b.{0,20}\b(all day|daily|every ?day|always|a lot|most of)\b",
+             r"\b(all day|daily|always|a lot)\b.{0,20}\b(ac|a/c|air[- ]?condition\w*|heater|heating)\b"), True, False),
+        (_rx(r"^\s*(no|nope|nahi|never|rarely)\b", r"^\s*" + _deva("नहीं")), False, True),
+        (_rx(r"^\s*(yes|yeah|yup|haan|daily|always)\b", r"^\s*" + _deva("हाँ", "हां")), True, True),
+    ],
+    "energy_source": [
+        (_rx(r"\b(partly|some|partial)\b.{0,15}\b(solar|renewable)", r"\bmixed\b"), "Mixed Grid", False),
+        (_rx(r"\b(solar|rooftop|renewable|green tariff|wind)\b", _deva("सोलर")), "100% Renewable Tariff / Solar", False),
+        (_rx(r"\b(grid|coal|electricity board|discom|normal|standard|regular)\b"), "Standard Grid (Fossil Heavy)", True),
+    ],
+    "fashion": [
+        (_rx(r"\b(second[- ]?hand|thrift(ed|ing)?|pre-?owned|hand-?me-?downs?|used clothes)\b"), "Mostly Second-hand/Thrift", False),
+        (_rx(r"\b(sustainable|organic|khadi|handloom|eco[- ]?friendly) (brands?|clothes|clothing|fabric)", r"\bonly sustainable\b"), "Sustainable Brands Only", False),
+        (_rx(r"\b(every (week|month)|frequent(ly)?|very often|a lot|shein|zara|h&m|fast fashion|whenever there'?s a sale)\b"), "Frequent Fast Fashion", False),
+        (_rx(r"\b(occasional(ly)?|rarely|sometimes|few times a year|festivals?|diwali|twice a year|once a year)\b"), "Occasional Mainstream Brands", False),
+    ],
+    "tech": [
+        (_rx(r"\b(until|till) (it )?(breaks?|broken|dies|stops working)\b", r"\bas long as (possible|it works)\b", r"\b([4-9]|five|six)\+? years\b"), "Use until broken", False),
+        (_rx(r"\b(2|3|two|three)\s*(-|to|or)?\s*(3|three)?\s*years?\b"), "Upgrade every 2-3 years", False),
+        (_rx(r"\b(every year|yearly|annually|latest model|each year)\b"), "Upgrade yearly", False),
+    ],
+}
+
+DISTANCE = _rx(r"(\d+(?:\.\d+)?)\s*(km|kms|kilomet(?:er|re)s?|miles?)\b(.{0,25})")
+FLIGHT_COUNT = _rx(r"(\d+)\s*(?:flights?|times|trips?)")
+BARE_NUMBER = _rx(r"^\D*(\d+)\D*$")
+
+
+def format_user_data(commute_type, weekly_distance, flights, diet_type, food_source,
+                     home_type, hvac, energy_source, fashion, tech):
+    """The four lifestyle strings generate_eco_profile expects (same wording as the form)."""
+    return {
+        "transport": f"Method: {commute_type}, Distance: {weekly_distance}/wk, Flights: {flights}",
+        "diet": f"Type: {diet_type}, Sourcing: {food_source}",
+        "energy": f"Home: {home_type}, Heavy HVAC: {hvac}, Source: {energy_source}",
+        "shopping": f"Fashion: {fashion}, Tech: {tech}",
+    }
+
+
+class EcoProfile:
+    """Eco-Profile answers collected so far; unanswered fields are None."""
+    __slots__ = tuple(PROFILE_FIELDS) + ("sources",)
+
+    def __init__(self):
+        for field in PROFILE_FIELDS:
+            setattr(self, field, None)
+        # Field -> "pattern" or "llm", i.e. how it was filled
+        self.sources = {}
+
+    def set(self, field, value, source):
+        """Stores a value after checking it against the field's allowed values; returns True if stored."""
+        allowed = PROFILE_FIELDS[field]
+        if allowed == "int":
+            try:
+                value = max(0, min(MAX_WEEKLY_DISTANCE, int(round(float(value)))))
+            except (TypeError, ValueError):
+                return False
+        elif allowed == "bool":
+            if not isinstance(value, bool):
+                return False
+        elif value not in allowed:
+            return False
+        setattr(self, field, value)
+        self.sources[field] = source
+        return True
+
+    def missing(self):
+        return [field for field in PROFILE_FIELDS if getattr(self, field) is None]
+
+    def filled(self):
+        return {field: getattr(self, field) for field in PROFILE_FIELDS if getattr(self, field) is not None}
+
+    def is_complete(self):
+        return not self.missing()
+
+    def to_user_data(self):
+        """generate_eco_profile input; fields the chat didn't cover read "Not stated"."""
+        values = {field: NOT_STATED if getattr(self, field) is None else getattr(self, field) for field in PROFILE_FIELDS}
+        return format_user_data(**values)
+
+
+def question_fields(question):
+    """Profile fields a coach question is asking about."""
+    return [field for field, pattern in QUESTION_TOPICS.items() if question and pattern.search(question)]
+
+
+def _weekly_distance(answer, targeted):
+    match = DISTANCE.search(answer)
+    if match:
+        distance, unit, context = float(match.group(1)), match.group(2).lower(), match.group(3).lower()
+        if unit.startswith("mile"):
+            distance *= 1.609
+        if re.search(r"each way|one way", context):
+            distance *= 2
+        if not re.search(r"week", context):
+            distance *= 5  # a daily figure: five commuting days a week
+        return distance
+    match = BARE_NUMBER.match(answer) if targeted else None
+    return float(match.group(1)) if match else None
+
+
+def _flight_count(answer, targeted):
+    match = FLIGHT_COUNT.search(answer) or (BARE_NUMBER.match(answer) if targeted else None)
+    if not match:
+        return None
+    count = int(match.group(1))
+    if count == 0:
+        return "None"
+    return "1-2 Short Flights" if count <= 2 else "3-5 Flights" if count <= 5 else "Frequent Flyer (6+ flights)"
+
+
+def match_field(field, answer, targeted=False):
+    """Value for `field` found in `answer` by the local patterns, or None."""
+    if field == "weekly_distance":
+        return _weekly_distance(answer, targeted)
+    if field == "flights":
+        count = _flight_count(answer, targeted)
+        if count is not None:
+            return count
+    rules = FIELD_RULES[field]
+    if field == "food_source" and rules[1][0].search(answer) and rules[2][0].search(answer):
+        return "Mix of Supermarket & Local"
+    for pattern, value, targeted_only in rules:
+        if (targeted or not targeted_only) and pattern.search(answer):
+            return value
+    return None
+
+
+class ProfileExtractor:
+    """
+    Fills an EcoProfile turn by turn. `resolve(fields, question, answer)` is an
+    optional LLM fallback: given {field: allowed values} it returns {field: value}.
+    """
+
+    MIN_UNPLACED_ANSWER_CHARS = 20  # shorter answers to unrecognised questions aren't worth an LLM call
+
+    def __init__(self, resolve=None, profile=None):
+        self.resolve = resolve
+        self.profile = profile or EcoProfile()
+        self.llm_calls = 0
+
+    def update(self, question, answer):
+        """Processes one (coach question, user answer) turn; returns the fields it filled."""
+        filled = {}
+        targeted = question_fields(question)
+        for field in PROFILE_FIELDS:
+            is_target = field in targeted
+            # Volunteered information doesn't overwrite earlier answers
+            if not is_target and getattr(self.profile, field) is not None:
+                continue
+            value = match_field(field, answer, targeted=is_target)
+            if value is not None and self.profile.set(field, value, "pattern"):
+                filled[field] = getattr(self.profile, field)
+
+        if self.resolve:
+            if targeted:
+                ambiguous = [f for f in targeted if f not in filled]
+            elif not filled and len(answer.strip()) >= self.MIN_UNPLACED_ANSWER_CHARS:
+                # The question couldn't be placed (e.g. it was asked in another language)
+                ambiguous = self.profile.missing()
+            else:
+                ambiguous = []
+            if ambiguous:
+                self.llm_calls += 1
+                try:
+                    resolved = self.resolve({f: PROFILE_FIELDS[f] for f in ambiguous}, question, answer) or {}
+                except Exception as e:
+                    print(f"Profile extraction fallback failed: {e}")
+                    resolved = {}
+                for field, value in resolved.items():
+                    if field in ambiguous and value is not None and self.profile.set(field, value, "llm"):
+                        filled[field] = getattr(self.profile, field)
+        return filled
+
+    def update_from_messages(self, messages):
+        """Runs update() for the last user turn of a chat transcript."""
+        if not messages or messages[-1]["role"] != "user":
+            return {}
+        question = messages[-2]["content"] if len(messages) > 1 and messages[-2]["role"] == "assistant" else ""
+        return self.update(question, messages[-1]["content"])
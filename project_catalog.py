@@ -0,0 +1,144 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------------------
+# COLUMNAR PROJECT CATALOG
+# -----------------------------------------------------------------------------
+# Projects are stored column-wise (one NumPy array per field) with a boolean
+# bitmap per distinct value of every filterable field, plus a precomputed sort
+# order per sortable field. A filter is a handful of bitmap ORs/ANDs and a
+# sorted result is one pass over the precomputed order, so the cost no longer
+# depends on scanning Python dicts one by one.
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "projects.json")
+
+# Best to worst; ratings not listed here sort after all known ones
+RATING_ORDER = ["AAA+", "AAA", "AA+", "AA", "AA-", "A+", "A", "A-", "BBB+", "BBB", "BBB-", "B+", "B", "B-"]
+
+INDEXED_FIELDS = ["type", "registry", "rating", "vintage"]
+SORTABLE_FIELDS = ["name", "price_per_tonne", "vintage", "funded_percent", "rating"]
+
+
+class ProjectCatalog:
+    def __init__(self, records):
+        self.size = len(records)
+        fields = list(records[0].keys()) if records else []
+        self.columns = {}
+        for field in fields:
+            values = [r.get(field) for r in records]
+            if field == "sdgs":
+                # Multi-valued column: one Python list per row (filled element-wise so
+                # equal-length lists are not turned into a 2-D array)
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+                self.columns[field] = column
+            else:
+                self.columns[field] = np.array(values)
+
+        # Primary key lookup: project id -> row position
+        self.id_index = {self._scalar(pid): row for row, pid in enumerate(self.columns.get("id", []))}
+
+        # Bitmap index: field -> value -> boolean mask over all rows
+        self.indexes = {field: self._build_bitmaps(self.columns[field]) for field in INDEXED_FIELDS if field in self.columns}
+        if "sdgs" in self.columns:
+            self.indexes["sdg"] = self._build_multi_bitmaps(self.columns["sdgs"])
+
+        # Sorted index: field -> row order ascending by that field
+        self.sort_orders = {}
+        for field in SORTABLE_FIELDS:
+            if field not in self.columns:
+                continue
+            keys = self._rating_rank(self.columns[field]) if field == "rating" else self.columns[field]
+            self.sort_orders[field] = np.argsort(keys, kind="stable")
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_CATALOG_PATH):
+        """Loads projects from a JSON array or a CSV file (SDGs as a ';'-separated column)."""
+        if path.lower().endswith(".csv"):
+            df = pd.read_csv(path)
+            if "sdgs" in df.columns:
+                df["sdgs"] = df["sdgs"].fillna("").astype(str).map(lambda v: [s for s in v.split(";") if s])
+            return cls(df.to_dict(orient="records"))
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _build_bitmaps(column):
+        values, codes = np.unique(column, return_inverse=True)
+        return {value.item() if hasattr(value, "item") else value: codes == code for code, value in enumerate(values)}
+
+    def _build_multi_bitmaps(self, column):
+        bitmaps = {}
+        for row, values in enumerate(column):
+            for value in values:
+                if value not in bitmaps:
+                    bitmaps[value] = np.zeros(self.size, dtype=bool)
+                bitmaps[value][row] = True
+        return bitmaps
+
+    @staticmethod
+    def _rating_rank(column):
+        rank = {rating: i for i, rating in enumerate(RATING_ORDER)}
+        return np.array([rank.get(r, len(RATING_ORDER)) for r in column])
+
+    def distinct(self, field):
+        """Sorted distinct values of an indexed field (use 'sdg' for SDGs)."""
+        values = list(self.indexes.get(field, {}).keys())
+        if field == "sdg":
+            return sorted(values, key=lambda v: int(v) if str(v).isdigit() else v)
+        if field == "rating":
+            return [r for r in RATING_ORDER if r in values] + sorted(v for v in values if v not in RATING_ORDER)
+        return sorted(values)
+
+    def mask(self, **filters):
+        """
+        Combined filter as a boolean mask. Each keyword is a field from
+        INDEXED_FIELDS (or 'sdg') with a single value or a collection of values:
+        values within one field are OR-ed, different fields are AND-ed.
+        None means "don't filter on this field".
+        """
+        result = np.ones(self.size, dtype=bool)
+        for field, wanted in filters.items():
+            if wanted is None:
+                continue
+            bitmaps = self.indexes[field]
+            if isinstance(wanted, (str, int, np.integer)):
+                wanted = [wanted]
+            field_mask = np.zeros(self.size, dtype=bool)
+            for value in wanted:
+                if value in bitmaps:
+                    field_mask |= bitmaps[value]
+            result &= field_mask
+        return result
+
+    def query(self, sort_by=None, descending=False, **filters):
+        """Row positions matching `filters`, optionally ordered by a field in SORTABLE_FIELDS."""
+        selected = self.mask(**filters)
+        if sort_by is None:
+            return np.flatnonzero(selected)
+        # Ratings sort best-first when ascending (AAA+ has the lowest rank)
+        order = self.sort_orders[sort_by]
+        if descending:
+            order = order[::-1]
+        return order[selected[order]]
+
+    def get(self, project_id):
+        """Single project as a dict, looked up by its id."""
+        return self.records([self.id_index[project_id]])[0]
+
+    def records(self, rows=None):
+        """Rows as a list of dicts, in the order given (all rows if None)."""
+        rows = range(self.size) if rows is None else rows
+        return [{field: self._scalar(column[row]) for field, column in self.columns.items()} for row in rows]
+
+    def frame(self, rows=None):
+        """Rows as a DataFrame, built straight from the columns."""
+        rows = np.arange(self.size) if rows is None else np.asarray(rows, dtype=int)
+        return pd.DataFrame({field: column[rows] for field, column in self.columns.items()})
+
+    @staticmethod
+    def _scalar(value):
+        return value.item() if isinstance(value, np.generic) else value
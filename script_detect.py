@@ -0,0 +1,173 @@
+import re
+from bisect import bisect_right
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# SINGLE-PASS SCRIPT & LANGUAGE DETECTOR
+# -----------------------------------------------------------------------------
+# Classifies text by the Unicode blocks of its letters. The text's code points
+# are mapped to script ids through a precomputed table and counted with NumPy
+# (one vectorized pass, no per-character Python loop); the dominant script (with
+# the share of letters it holds as a confidence) picks the language. Scripts
+# shared by several languages are split on tell-tale letters (Assamese vs
+# Bengali, Marathi's ळ) and, for Devanagari text only, on frequent function
+# words in the first MARATHI_SCAN_CHARS characters (Marathi vs Hindi).
+
+# (first code point, last code point, script) for every script used by the
+# languages of the Eighth Schedule, plus Latin for English
+SCRIPT_RANGES = [
+    (0x0041, 0x005A, "Latin"), (0x0061, 0x007A, "Latin"), (0x00C0, 0x024F, "Latin"),
+    (0x0600, 0x06FF, "Arabic"), (0x0750, 0x077F, "Arabic"),
+    (0x0900, 0x097F, "Devanagari"),
+    (0x0980, 0x09FF, "Bengali"),
+    (0x0A00, 0x0A7F, "Gurmukhi"),
+    (0x0A80, 0x0AFF, "Gujarati"),
+    (0x0B00, 0x0B7F, "Odia"),
+    (0x0B80, 0x0BFF, "Tamil"),
+    (0x0C00, 0x0C7F, "Telugu"),
+    (0x0C80, 0x0CFF, "Kannada"),
+    (0x0D00, 0x0D7F, "Malayalam"),
+    (0x1C50, 0x1C7F, "Ol Chiki"),
+    (0xA8E0, 0xA8FF, "Devanagari"),
+    (0xABC0, 0xABFF, "Meetei Mayek"),
+    (0xFB50, 0xFDFF, "Arabic"), (0xFE70, 0xFEFF, "Arabic"),
+]
+
+# Default language per script (ISO 639-1 where one exists)
+SCRIPT_LANGUAGES = {
+    "Latin": "en", "Devanagari": "hi", "Bengali": "bn", "Gurmukhi": "pa", "Gujarati": "gu",
+    "Odia": "or", "Tamil": "ta", "Telugu": "te", "Kannada": "kn", "Malayalam": "ml",
+    "Arabic": "ur", "Ol Chiki": "sat", "Meetei Mayek": "mni",
+}
+
+# Letters used by one language of a shared script but not the other
+MARATHI_LETTERS = {"\u0933"}  # ळ
+ASSAMESE_LETTERS = {"\u09F0", "\u09F1"}  # ৰ ৱ
+# Frequent function words that tell Marathi and Hindi apart
+MARATHI_WORDS = {"आहे", "आहेत", "आणि", "नाही", "मी", "तुम्ही", "तुमचा", "तुमची", "तुमच्या", "हे", "ते", "करा", "पण", "होते"}
+HINDI_WORDS = {"है", "हैं", "और", "का", "की", "के", "में", "नहीं", "मैं", "आप", "आपका", "आपकी", "यह", "करें", "था"}
+
+DEFAULT_LANGUAGE = "en"
+MARATHI_SCAN_CHARS = 2000  # function words are frequent; a prefix is enough to tell
+
+# Dense lookup for the BMP range holding every Indic block (one list index per
+# code point); anything above falls back to a binary search over SCRIPT_RANGES.
+_DENSE_LIMIT = 0x0E00
+_DENSE_TABLE = [None] * _DENSE_LIMIT
+for _start, _end, _script in SCRIPT_RANGES:
+    for _cp in range(_start, min(_end, _DENSE_LIMIT - 1) + 1):
+        _DENSE_TABLE[_cp] = _script
+# Danda, double danda and Devanagari digits are shared punctuation across Indic scripts
+for _cp in range(0x0964, 0x0970):
+    _DENSE_TABLE[_cp] = None
+_SCRIPTS = sorted(SCRIPT_LANGUAGES)
+_DENSE_IDS = np.array([-1 if s is None else _SCRIPTS.index(s) for s in _DENSE_TABLE] + [-1], dtype=np.int64)
+_SPARSE_RANGES = sorted(r for r in SCRIPT_RANGES if r[1] >= _DENSE_LIMIT)
+_SPARSE_STARTS = [r[0] for r in _SPARSE_RANGES]
+
+DEVANAGARI_WORD = re.compile(r"[\u0900-\u0963\u0970-\u097F]+")
+
+
+def script_of(char):
+    """Script name of a single character, or None for digits, punctuation, emoji etc."""
+    cp = ord(char)
+    if cp < _DENSE_LIMIT:
+        return _DENSE_TABLE[cp]
+    i = bisect_right(_SPARSE_STARTS, cp) - 1
+    if i >= 0 and cp <= _SPARSE_RANGES[i][1]:
+        return _SPARSE_RANGES[i][2]
+    return None
+
+
+def detect_script(text):
+    """
+    Dominant script and language of `text`.
+
+    Returns {"script", "lang", "confidence", "counts"}: confidence is the
+    dominant script's share of all classified letters (0.0 when there are none,
+    in which case the language defaults to English).
+    """
+    cps = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    # Code points above the dense table all land on its trailing "no script" slot
+    ids = _DENSE_IDS[np.minimum(cps, _DENSE_LIMIT)]
+    script_counts = np.bincount(ids[ids >= 0], minlength=len(_SCRIPTS))
+    counts = {_SCRIPTS[i]: int(n) for i, n in enumerate(script_counts) if n}
+    sparse = cps[cps >= _DENSE_LIMIT]
+    if sparse.size:
+        for cp, n in zip(*np.unique(sparse, return_counts=True)):
+            script = script_of(chr(cp))
+            if script is not None:
+                counts[script] = counts.get(script, 0) + int(n)
+
+    total = sum(counts.values())
+    if not total:
+        return {"script": "Latin", "lang": DEFAULT_LANGUAGE, "confidence": 0.0, "counts": counts}
+
+    script = max(counts, key=counts.get)
+    lang = SCRIPT_LANGUAGES[script]
+    if script == "Devanagari":
+        marathi = sum(text.count(c) for c in MARATHI_LETTERS)
+        hindi = 0
+        for word in DEVANAGARI_WORD.findall(text, 0, MARATHI_SCAN_CHARS):
+            marathi += word in MARATHI_WORDS
+            hindi += word in HINDI_WORDS
+        if marathi > hindi:
+            lang = "mr"
+    elif script == "Bengali" and any(c in text for c in ASSAMESE_LETTERS):
+        lang = "as"
+    return {"script": script, "lang": lang, "confidence": counts[script] / total, "counts": counts}
+
+
+def detect_language(text):
+    """Language code of the dominant script (see detect_script)."""
+    return detect_script(text)["lang"]
+
+
+if __name__ == "__main__":
+    # Accuracy and speed against the old sequential regex scans. The old chain
+    # stops at the first of its scripts found anywhere, so it is quicker on
+    # non-Latin replies but misreads Marathi, Punjabi, Odia and Urdu; both cost
+    # tens of microseconds per chat reply.
+    import time
+
+    def regex_language(text):
+        for pattern, code in [(r'[\u0900-\u097F]', 'hi'), (r'[\u0980-\u09FF]', 'bn'), (r'[\u0A80-\u0AFF]', 'gu'),
+                              (r'[\u0B80-\u0BFF]', 'ta'), (r'[\u0C00-\u0C7F]', 'te'), (r'[\u0C80-\u0CFF]', 'kn'),
+                              (r'[\u0D00-\u0D7F]', 'ml')]:
+            if re.search(pattern, text):
+                return code
+        return 'en'
+
+    samples = {
+        "hi": "आपका कार्बन फुटप्रिंट परिवहन में सबसे अधिक है और यह हर महीने बढ़ रहा है।",
+        "mr": "तुमचा कार्बन फूटप्रिंट वाहतुकीमध्ये सर्वाधिक आहे आणि तो दर महिन्याला वाढत आहे.",
+        "pa": "ਤੁਹਾਡਾ ਕਾਰਬਨ ਫੁੱਟਪ੍ਰਿੰਟ ਆਵਾਜਾਈ ਵਿੱਚ ਸਭ ਤੋਂ ਵੱਧ ਹੈ।",
+        "or": "ଆପଣଙ୍କ କାର୍ବନ ଫୁଟପ୍ରିଣ୍ଟ ପରିବହନରେ ସର୍ବାଧିକ।",
+        "ur": "آپ کا کاربن فٹ پرنٹ نقل و حمل میں سب سے زیادہ ہے۔",
+        "ta": "உங்கள் கார்பன் தடம் போக்குவரத்தில் அதிகம்.",
+        "en": "Your carbon footprint is highest in Transportation (ESG score 62/100).",
+    }
+    for expected, text in samples.items():
+        result = detect_script(text)
+        print(f"{expected}: detected {result['lang']:3s} ({result['script']}, {result['confidence']:.0%})  old regex: {regex_language(text)}")
+
+    for label, text in [("mixed", " ".join(samples.values()) * 2000), ("english", samples["en"] * 10000)]:
+        started = time.perf_counter()
+        detect_script(text)
+        detect_s = time.perf_counter() - started
+        started = time.perf_counter()
+        regex_language(text)
+        regex_s = time.perf_counter() - started
+        print(f"{label:8s} {len(text):>9,} chars: histogram {detect_s * 1000:6.1f} ms, old regex {regex_s * 1000:6.1f} ms")
+
+    # Typical chat replies: a few hundred characters, per call
+    for label in ["en", "mr", "ta"]:
+        text = samples[label] * 4
+        timings = []
+        for fn in (detect_script, regex_language):
+            started = time.perf_counter()
+            for _ in range(10000):
+                fn(text)
+            timings.append((time.perf_counter() - started) / 10000 * 1e6)
+        print(f"reply {label}  {len(text):>6,} chars: histogram {timings[0]:6.1f} us, old regex {timings[1]:6.1f} us")
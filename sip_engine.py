@@ -0,0 +1,120 @@
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# VECTORIZED SIP PROJECTION ENGINE
+# -----------------------------------------------------------------------------
+# An SIP invests a fixed amount at the start of every month, so its value after
+# n months is the future value of an annuity-due:
+#
+#     FV = P * ((1 + r)^n - 1) / r * (1 + r)        (FV = P * n when r == 0)
+#
+# Every function here is written against NumPy arrays, so a single call can
+# evaluate one projection or a whole (amount x tenure x IRR) grid at once.
+
+
+def monthly_rate(irr_percent):
+    """Converts an annual IRR in percent to the monthly compounding rate."""
+    return np.asarray(irr_percent, dtype=float) / 100 / 12
+
+
+def sip_future_value(monthly_inv, months, irr_percent):
+    """
+    Closed-form future value of a monthly SIP (annuity-due).
+    All arguments broadcast against each other like any NumPy expression.
+    """
+    payment = np.asarray(monthly_inv, dtype=float)
+    n = np.asarray(months, dtype=float)
+    r = monthly_rate(irr_percent)
+
+    # expm1/log1p keep (1 + r)^n - 1 accurate for the small monthly rates we use
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.expm1(n * np.log1p(r)) / r * (1 + r)
+    return payment * np.where(r == 0, n, growth)
+
+
+def sip_carbon(monthly_inv, months, carbon_yield_per_1k):
+    """Cumulative kg CO2 reduced after `months` of contributions (linear in capital deployed)."""
+    monthly_carbon = np.asarray(monthly_inv, dtype=float) / 1000 * np.asarray(carbon_yield_per_1k, dtype=float)
+    return monthly_carbon * np.asarray(months, dtype=float)
+
+
+def lump_sum_value(principal, years, irr_percent):
+    """Value of a one-time investment compounded annually at the given IRR."""
+    rate = np.asarray(irr_percent, dtype=float) / 100
+    return np.asarray(principal, dtype=float) * np.power(1 + rate, np.asarray(years, dtype=float))
+
+
+def advance_sip(current_value, monthly_inv, months, irr_percent):
+    """
+    Value of an existing SIP after `months` more monthly contributions: the
+    current balance compounds, and the new contributions add an annuity-due.
+    """
+    r = monthly_rate(irr_percent)
+    n = np.asarray(months, dtype=float)
+    return np.asarray(current_value, dtype=float) * np.exp(n * np.log1p(r)) + sip_future_value(monthly_inv, n, irr_percent)
+
+
+def sip_timeline(monthly_inv, duration_years, irr_percent, carbon_yield_per_1k):
+    """
+    Year-end checkpoints for a single SIP, shaped for the dashboard charts.
+    Returns (timeline labels, invested, future values, carbon accumulated) as arrays.
+    """
+    months = int(duration_years * 12)
+    checkpoints = np.arange(12, months + 1, 12)
+    if checkpoints.size == 0 or checkpoints[-1] != months:
+        checkpoints = np.append(checkpoints, months)
+
+    timeline = [f"Year {m // 12}" for m in checkpoints]
+    invested = monthly_inv * checkpoints
+    future_values = sip_future_value(monthly_inv, checkpoints, irr_percent)
+    carbon = sip_carbon(monthly_inv, checkpoints, carbon_yield_per_1k)
+    return timeline, invested, future_values, carbon
+
+
+def sip_grid(amounts, tenure_years, irr_percents, carbon_yields_per_1k=None):
+    """
+    Evaluates every (amount, tenure, IRR) combination in one broadcast computation.
+
+    Returns a dict of arrays shaped (len(amounts), len(tenure_years), len(irr_percents)):
+    'future_value', 'invested' and, when carbon yields are given (one per IRR,
+    i.e. per portfolio), 'carbon'.
+    """
+    amounts = np.asarray(amounts, dtype=float)[:, None, None]
+    months = np.asarray(tenure_years, dtype=float)[None, :, None] * 12
+    irrs = np.asarray(irr_percents, dtype=float)[None, None, :]
+
+    grid = {
+        "future_value": sip_future_value(amounts, months, irrs),
+        "invested": np.broadcast_to(amounts * months, np.broadcast_shapes(amounts.shape, months.shape, irrs.shape)),
+    }
+    if carbon_yields_per_1k is not None:
+        yields = np.asarray(carbon_yields_per_1k, dtype=float)[None, None, :]
+        grid["carbon"] = sip_carbon(amounts, months, yields)
+    return grid
+
+
+if __name__ == "__main__":
+    # Quick benchmark: the old month-by-month loop vs a 100x15x4 grid in one call
+    import time
+
+    def loop_projection(monthly_inv, duration_years, irr_percent):
+        value = 0
+        for _ in range(duration_years * 12):
+            value = (value + monthly_inv) * (1 + irr_percent / 100 / 12)
+        return value
+
+    started = time.perf_counter()
+    single = loop_projection(5000, 15, 9.5)
+    loop_s = time.perf_counter() - started
+
+    amounts = np.arange(500, 50001, 500)
+    tenures = np.arange(1, 16)
+    irrs = [9.5, 7.2, 4.5, 11.0]
+    started = time.perf_counter()
+    grid = sip_grid(amounts, tenures, irrs, [850, 1200, 1500, 600])
+    grid_s = time.perf_counter() - started
+
+    closed_form = grid["future_value"][list(amounts).index(5000), 14, 0]
+    print(f"Single loop projection (15y):  {loop_s * 1e6:8.1f} us")
+    print(f"Grid of {grid['future_value'].size} projections:   {grid_s * 1e6:8.1f} us")
+    print(f"Loop vs closed form (₹5k, 15y, 9.5%): {single:,.2f} vs {closed_form:,.2f}")
@@ -0,0 +1,29 @@
+import functools
+import json
+
+from api import index
+
+
+def test_json_array_items_must_be_objects():
+    response = index.app.test_client().post("/api/calculate", json=[{"Amount": 120}, 5])
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Transaction 2 must be a JSON object"}
+
+
+def test_unexpected_scoring_error_is_reported_in_band(monkeypatch):
+    score_batch = index.score_batch
+
+    def failing_score_batch(df, first_row=0):
+        if first_row:
+            raise RuntimeError("boom")
+        return score_batch(df, first_row)
+
+    monkeypatch.setattr(index, "request_batches", functools.partial(index.request_batches, batch_rows=2))
+    monkeypatch.setattr(index, "score_batch", failing_score_batch)
+    body = "\n".join(json.dumps({"Amount": 100 + i, "Category": "Food"}) for i in range(5))
+    response = index.app.test_client().post("/api/calculate", data=body, content_type="application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert response.status_code == 200
+    assert [line["row"] for line in lines[:2]] == [0, 1]
+    assert lines[-1] == {"error": "Could not score transactions: RuntimeError: boom", "row": 2}
@@ -0,0 +1,58 @@
+import csv
+import os
+import shutil
+
+import batch_score
+from carbon_engine import DEFAULT_TRANSACTIONS_PATH
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), DEFAULT_TRANSACTIONS_PATH)
+
+
+def _manifest(tmp_path, users):
+    statements = tmp_path / "in"
+    statements.mkdir()
+    for user_id in users:
+        if user_id != "ghost":
+            shutil.copy(SAMPLE, statements / f"{user_id}.csv")
+    manifest = tmp_path / "manifest.csv"
+    with open(manifest, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user_id", "path"])
+        writer.writerows((u, f"in/{u}.csv") for u in users)
+    return batch_score.read_manifest(str(manifest))
+
+
+def _rollup_users(out_dir):
+    with open(os.path.join(out_dir, "rollups.csv"), newline="", encoding="utf-8") as f:
+        return [row["user_id"] for row in csv.DictReader(f)]
+
+
+def test_missing_statement_fails_only_that_user(tmp_path):
+    jobs = _manifest(tmp_path, ["a", "ghost", "b"])
+    out_dir = str(tmp_path / "out")
+
+    stats = batch_score.run_batch(jobs, out_dir, workers=2, log=lambda _: None)
+
+    assert stats["scored"] == 2 and stats["failed"] == 1
+    assert _rollup_users(out_dir) == ["a", "b"]
+    entry = batch_score.load_progress(out_dir)["ghost"]
+    assert entry["status"] == "error" and "FileNotFoundError" in entry["error"]
+
+
+def test_worker_crash_is_journalled_and_resumable(tmp_path, monkeypatch):
+    jobs = _manifest(tmp_path, ["a", "b"])
+    out_dir = str(tmp_path / "out")
+
+    def crash(result, path, out_dir):
+        os._exit(1)  # kills the worker process, breaking the pool
+
+    monkeypatch.setattr(batch_score, "_score_user", crash)
+    stats = batch_score.run_batch(jobs, out_dir, workers=1, log=lambda _: None)
+    assert stats["failed"] == 2
+    assert all(e["status"] == "error" for e in batch_score.load_progress(out_dir).values())
+    assert _rollup_users(out_dir) == []
+
+    monkeypatch.undo()
+    stats = batch_score.run_batch(jobs, out_dir, workers=1, log=lambda _: None)
+    assert stats["scored"] == 2 and stats["skipped"] == 0
+    assert _rollup_users(out_dir) == ["a", "b"]
@@ -0,0 +1,11 @@
+import numpy as np
+
+from carbon_engine import CarbonScoringEngine
+
+
+def test_generate_explanations_matches_per_row_text():
+    categories = ["Food", "Transportation", "Food", "Other", "Transportation"]
+    factors = np.array([0.06, 0.15, 0.09, 0.05, 0.15])
+    texts = CarbonScoringEngine.generate_explanations(categories, factors)
+    expected = [CarbonScoringEngine.generate_explanation({"Category": c}, f, None) for c, f in zip(categories, factors)]
+    assert list(texts) == expected
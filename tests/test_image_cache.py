@@ -0,0 +1,18 @@
+import image_cache
+
+
+def test_cache_only_lookup_never_downloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_cache, "IMAGE_CACHE_DIR", str(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("must not hit the network")
+
+    monkeypatch.setattr(image_cache, "fetch_image", fail)
+    url = "https://example.invalid/forest.jpg"
+
+    assert image_cache.thumbnail(url, download=False) is None
+    assert image_cache.thumbnail_data_uri(url, download=False) == image_cache.placeholder_data_uri()
+
+    with open(image_cache.cache_path(url), "wb") as f:
+        f.write(b"RIFFwebp")
+    assert image_cache.thumbnail_data_uri(url, download=False).startswith("data:image/webp;base64,")
@@ -0,0 +1,103 @@
+import functools
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+
+import main
+
+HANG_SECONDS = 1.5
+
+
+class StubApp(BaseHTTPRequestHandler):
+    """Local stand-in for Streamlit Cloud: /asleep/<n> shows the wake button until it's clicked."""
+    woken = set()
+
+    def do_GET(self):
+        if self.path == "/hang":
+            time.sleep(HANG_SECONDS)
+        asleep = self.path.startswith("/asleep/") and self.path not in self.woken
+        body = f"<button>{main.WAKE_BUTTON_TEXT}</button>" if asleep else "<div>app</div>"
+        self._send(body)
+
+    def do_POST(self):
+        self.woken.add(self.path.removesuffix("/wake"))
+        self._send("")
+
+    def _send(self, body):
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class StubButton:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        urllib.request.urlopen(urllib.request.Request(self.driver.url + "/wake", method="POST"))
+
+
+class StubDriver:
+    """The slice of the WebDriver API wake_up_app uses, backed by plain HTTP."""
+
+    def __init__(self):
+        self.url = None
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        self.url = url
+        urllib.request.urlopen(url).read()
+
+    def find_element(self, by, value):
+        if main.WAKE_BUTTON_TEXT in urllib.request.urlopen(self.url).read().decode():
+            return StubButton(self)
+        raise NoSuchElementException(value)
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    # Pages without a button are only reported awake after the wait times out
+    monkeypatch.setattr(main, "wake_up_app", functools.partial(main.wake_up_app, wait_timeout=0.3))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubApp)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_pool_wakes_stub_apps(stub_server):
+    urls = [f"{stub_server}/asleep/1", f"{stub_server}/asleep/2", f"{stub_server}/awake"]
+    timings = {}
+    results = main.wake_apps(urls, workers=2, time_budget=30, driver_factory=StubDriver, timings=timings)
+
+    assert results == {urls[0]: "woken", urls[1]: "woken", urls[2]: "awake"}
+    assert set(timings) == set(urls)
+    assert {"navigation", "button_detect", "wake", "total"} <= set(timings[urls[0]])
+
+
+def test_results_are_not_changed_by_a_worker_finishing_after_the_budget(stub_server):
+    url = f"{stub_server}/hang"
+    timings = {}
+    results = main.wake_apps([url], workers=1, time_budget=0.3, driver_factory=StubDriver, timings=timings)
+    assert results == {url: "timeout"}
+
+    time.sleep(HANG_SECONDS + 0.5)  # the worker has now finished the page
+    assert results == {url: "timeout"}
+    assert timings == {}
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from carbon_engine import CarbonScoringEngine
+from note_classifier import NO_CLASS, NoteClassifier, get_classifier
+
+
+def class_of(note):
+    classifier = get_classifier()
+    rule_id = classifier.classify(note)
+    return None if rule_id == NO_CLASS else classifier.classes[rule_id]
+
+
+def test_longest_phrase_wins():
+    assert class_of("idli pith 1kg") == "Grains & Staples"
+    assert class_of("idli 2 plates") == "Street Food & Snacks"
+
+
+def test_matches_whole_tokens_only():
+    assert class_of("automatic washing powder") is None
+    assert class_of("auto to station") == "Auto Rickshaw"
+
+
+def test_apostrophes_are_dropped():
+    assert class_of("Domino's") == "Restaurants & Delivery"
+
+
+def test_missing_notes_have_no_class():
+    fresh = NoteClassifier.from_file()
+    assert fresh.classify(np.nan) == NO_CLASS
+    assert fresh.classify(None) == NO_CLASS
+    assert list(fresh.classify_notes([np.nan, None, "milk"])[:2]) == [NO_CLASS, NO_CLASS]
+
+
+def test_score_frame_uses_note_factor_only_where_a_rule_matched():
+    df = pd.DataFrame({
+        "Category": ["Food", "Food"],
+        "Subcategory": ["General", "General"],
+        "Amount": [100.0, 100.0],
+        "Note": ["chicken biryani", "something unrecognised"],
+    })
+    factor, carbon, _ = CarbonScoringEngine.score_frame(df)
+    base = CarbonScoringEngine.score_frame(df, refine_notes=False)[0]
+    assert factor[0] == get_classifier().factors[get_classifier().classes.index("Meat & Fish")]
+    assert factor[1] == base[1]
+    assert list(carbon) == list(factor * 100)
+
+
+def test_each_distinct_note_is_classified_once_and_reused():
+    fresh = NoteClassifier.from_file()
+    notes = ["Milk 1lit", "milk 1lit", "Uber", "uber!", "idli pith", np.nan, "Milk 1lit"] * 50
+    normalized = {" ".join(note.lower().replace("!", "").split()) if isinstance(note, str) else "" for note in notes}
+
+    codes = fresh.classify_notes(notes)
+    assert fresh.last_stats == {"rows": len(notes), "unique_notes": len(normalized), "classified": len(normalized)}
+    assert list(codes) == [fresh.classify(note) for note in notes]
+
+    again = fresh.classify_notes(notes[::-1])
+    assert fresh.last_stats["classified"] == 0
+    assert fresh.hit_rate(fresh.last_stats) == 1.0
+    assert list(again) == [fresh.classify(note) for note in notes[::-1]]
@@ -0,0 +1,58 @@
+import pytest
+
+from profile_extractor import ProfileExtractor, match_field
+
+
+@pytest.mark.parametrize("answer", [
+    "मेरा कार्बन फुटप्रिंट कम करना है",  # कार inside कार्बन
+    "हर प्रकार का खाना खाता हूँ",  # कार inside प्रकार
+    "सरकार की योजना अच्छी है",  # कार inside सरकार
+])
+def test_devanagari_car_matches_whole_words_only(answer):
+    assert match_field("commute_type", answer) is None
+
+
+def test_devanagari_car_as_a_word_still_matches():
+    assert match_field("commute_type", "मैं कार से ऑफिस जाता हूँ") == "Gas/Petrol Car"
+
+
+@pytest.mark.parametrize("field, answer", [
+    ("commute_type", "बस, इतना ही"),  # बस = "that's all"
+    ("home_type", "मैं घर से काम करता हूँ"),  # घर = home, not a house size
+])
+def test_ambiguous_hindi_words_are_not_matched(field, answer):
+    assert match_field(field, answer) is None
+
+
+def test_diet_answer_mentioning_carbon_does_not_set_commute():
+    extractor = ProfileExtractor()
+    extractor.update("आप क्या खाते हैं?", "मैं शाकाहारी हूँ, कार्बन कम रखना चाहता हूँ")
+    assert extractor.profile.commute_type is None
+    assert extractor.profile.diet_type == "Vegetarian"
+
+
+def test_ambiguous_hindi_answer_goes_to_llm_fallback():
+    calls = []
+
+    def resolve(fields, question, answer):
+        calls.append(sorted(fields))
+        return {}
+
+    extractor = ProfileExtractor(resolve=resolve)
+    extractor.update("आप ऑफिस कैसे जाते हैं?", "रोज़ बस से जाता हूँ, करीब आधा घंटा")
+    assert extractor.profile.commute_type is None
+    assert calls and "commute_type" in calls[0]
+
+
+@pytest.mark.parametrize("answer", [
+    "vegetarian but I eat eggs",
+    "Mostly veg, eggs on weekends",
+    "I'm an eggetarian",
+    "eggs are fine, otherwise pure veg",
+])
+def test_vegetarian_with_eggs_is_vegetarian(answer):
+    assert match_field("diet_type", answer, targeted=True) == "Vegetarian"
+
+
+def test_non_veg_with_eggs_is_still_meat():
+    assert match_field("diet_type", "non-veg, eggs and chicken", targeted=True) == "Average (Meat 3-4x/week)"
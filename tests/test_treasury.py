@@ -0,0 +1,82 @@
+import pytest
+
+from sip_ledger import SipLedger
+from treasury import BUY, SELL, OrderBook
+
+
+def open_book(path):
+    ledger = SipLedger(path)
+    book = OrderBook(store=ledger.save_treasury_book)
+    book.restore(*ledger.treasury_book())
+    return ledger, book
+
+
+def test_restored_book_keeps_resting_orders_and_fills(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    ledger, book = open_book(path)
+    book.submit(SELL, 4000, 1.45, owner="treasury")
+    book.submit(SELL, 3000, 1.50, owner="treasury")
+    order, trades = book.submit(BUY, 5000, 1.50, owner="buyer")
+    assert order.remaining == 0 and len(trades) == 2
+    cancelled, _ = book.submit(BUY, 1000, 1.00, owner="buyer")
+    book.cancel(cancelled.order_id)
+    ledger.close()
+
+    ledger, restarted = open_book(path)
+    assert restarted.depth(SELL) == book.depth(SELL) == [(1.50, 2000)]
+    assert restarted.depth(BUY) == []
+    assert restarted.volume(owner="treasury", side=SELL) == 5000
+    assert ledger.treasury_listed("treasury") == 7000
+    assert [t["trade_id"] for t in restarted.trades] == [1, 2]
+
+    # New orders and fills continue the saved ids instead of overwriting them
+    order, trades = restarted.submit(BUY, 500, 1.50, owner="buyer")
+    assert order.order_id == cancelled.order_id + 1
+    assert trades[0]["trade_id"] == 3
+    assert restarted.depth(SELL) == [(1.50, 1500)]
+
+
+def test_treasury_sales_are_booked_against_platform_credits(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    ledger = SipLedger(path)
+    ledger.add_to_cart("u1", "Reforestation", "Fund", 100000, 12, 10)  # 1,000 kg per month
+    ledger.authorize_cart("u1", period="2024-12")
+    ledger.accrue("2025-02")
+    book = OrderBook(store=lambda orders, trades: ledger.save_treasury_book(orders, trades, credit_seller="treasury"))
+    book.submit(SELL, 3000, 1.45, owner="treasury")
+    book.submit(BUY, 1500, 1.45, owner="buyer")
+
+    sold = {row["vintage"]: row["sold_kg"] for row in ledger.platform_credits()}
+    assert sold == {"2024": 1000, "2025": 500}
+    ledger.rebuild_platform_credits()
+    ledger.close()
+
+    assert SipLedger(path).platform_sold() == 1500
+
+
+def test_failed_store_leaves_the_book_unchanged():
+    saved = []
+
+    def store(orders, trades):
+        if fail:
+            raise RuntimeError("disk full")
+        saved.append((orders, trades))
+
+    fail = False
+    book = OrderBook(store=store)
+    ask, _ = book.submit(SELL, 3000, 1.45, owner="treasury")
+    book.submit(SELL, 2000, 1.50, owner="treasury")
+
+    fail = True
+    with pytest.raises(RuntimeError):
+        book.submit(BUY, 4000, 1.50, owner="buyer")
+    with pytest.raises(RuntimeError):
+        book.cancel(ask.order_id)
+    assert book.depth(SELL) == [(1.45, 3000), (1.50, 2000)]
+    assert book.depth(BUY) == [] and book.trades == [] and book.volume() == 0
+    assert book.volume(owner="treasury", side=SELL) == 0
+
+    fail = False
+    order, trades = book.submit(BUY, 4000, 1.50, owner="buyer")
+    assert order.remaining == 0 and [t["trade_id"] for t in trades] == [1, 2]
+    assert book.depth(SELL) == [(1.50, 1000)]
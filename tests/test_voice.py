@@ -0,0 +1,76 @@
+import pytest
+
+import voice
+from script_detect import SCRIPT_LANGUAGES
+
+
+def test_playback_resumes_at_loaded_end_when_synthesis_falls_behind(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(voice.time, "monotonic", lambda: now[0])
+    renders = []
+    playback = voice.ProgressivePlayback(lambda audio, start: renders.append(start), "audio/wav")
+    clip = voice.get_backend("none").synthesize("x" * 40, "en")
+    clip_seconds = voice.audio_duration(clip, "audio/wav")
+
+    playback.update([clip])
+    now[0] += clip_seconds + 5  # the next sentence arrives long after the first one finished
+    playback.update([clip, clip])
+    now[0] += 0.3
+    playback.update([clip, clip, clip], final=True)
+
+    assert renders[0] == 0.0
+    assert renders[1] == clip_seconds  # not the wall-clock time, which would skip the new sentence
+    assert abs(renders[2] - (clip_seconds + 0.3)) < 1e-9  # fractional offset kept, no replay
+
+
+def test_gtts_voices_detected_languages_it_can_read():
+    pytest.importorskip("gtts")
+    backend = voice.GTTSBackend()
+    for lang in set(SCRIPT_LANGUAGES.values()) | {"mr"}:
+        assert backend.voice_lang(lang) in backend.supported | {None}, lang
+    assert backend.voice_lang("as") == "bn"
+    # No gTTS voice reads Odia, Ol Chiki or Meetei Mayek: left silent, never read as English
+    for lang in ("or", "sat", "mni"):
+        assert backend.voice_lang(lang) is None
+    assert backend.synthesize("ଓଡ଼ିଆ ଭାଷା", "or") == b""
+
+
+def test_prewarmed_sentences_are_the_ones_a_pipeline_plays(tmp_path):
+    class CountingBackend(voice.SilentBackend):
+        name = "counting"
+        cacheable = True
+        calls = 0
+
+        def synthesize(self, text, lang):
+            CountingBackend.calls += 1
+            return super().synthesize(text, lang)
+
+    backend, cache = CountingBackend(), voice.AudioCache(str(tmp_path))
+    message = "Hello! I am Ecopay AI, your advisor. Ask me anything about your spending habits."
+    assert voice.prewarm([message], cache=cache, backend=backend) == 1
+    warmed = CountingBackend.calls
+
+    speech = voice.SpeechPipeline(cache=cache, backend=backend)
+    for word in message.split(" "):
+        speech.feed(word + " ")
+    assert speech.audio()
+    assert CountingBackend.calls == warmed
+
+
+def test_backend_that_cannot_start_falls_back_to_silence(monkeypatch):
+    monkeypatch.setattr(voice.shutil, "which", lambda name: None)
+    monkeypatch.setattr(voice, "_backends", {})
+    backend = voice.get_backend("espeak")
+    assert backend.name == "none"
+    assert voice.SpeechPipeline(backend=backend).mime == "audio/wav"
+
+
+def test_playback_skips_render_while_no_sentence_has_audio():
+    renders = []
+    playback = voice.ProgressivePlayback(lambda audio, start: renders.append(audio), "audio/wav")
+    playback.update([b"", b""], final=True)
+    assert renders == [] and playback.loaded == 0
+
+    clip = voice.get_backend("none").synthesize("x" * 40, "en")
+    playback.update([b"", b"", clip], final=True)
+    assert renders == [clip]
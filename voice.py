@@ -0,0 +1,478 @@
+import hashlib
+import io
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------------------------------------------------------
+# TEXT-TO-SPEECH WITH A CONTENT-ADDRESSED AUDIO CACHE
+# -----------------------------------------------------------------------------
+# Speech comes from a pluggable backend (gTTS over the network, a local espeak-ng
+# synthesizer, or silence), picked with ECOPAY_TTS_BACKEND. Synthesized replies
+# are stored on disk under a hash of (backend, language, normalized text), so
+# the same phrase is only ever synthesized once per backend. The cache is
+# bounded in bytes and evicts the least recently played files first (a hit
+# refreshes the file's mtime).
+
+VOICE_CACHE_DIR = os.environ.get(
+    "ECOPAY_VOICE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".voice_cache")
+)
+VOICE_CACHE_MAX_BYTES = int(os.environ.get("ECOPAY_VOICE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+AUDIO_EXTENSIONS = {"audio/mp3": ".mp3", "audio/wav": ".wav"}
+
+TTS_BACKEND = os.environ.get("ECOPAY_TTS_BACKEND", "gtts")
+TTS_TIMEOUT = float(os.environ.get("ECOPAY_TTS_TIMEOUT", "20"))
+
+# Sentence pipeline: clips are synthesized concurrently on a shared pool
+TTS_WORKERS = int(os.environ.get("ECOPAY_TTS_WORKERS", "4"))
+MIN_SENTENCE_CHARS = 25  # shorter fragments (list markers, headers) ride along with the next sentence
+# Sentence ends: Latin punctuation, Devanagari danda / double danda, or a line break
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?।॥])\s+|\n+")
+
+
+def normalize_text(text):
+    """Strips markdown emphasis/headers and collapses whitespace, so cosmetic differences share audio."""
+    text = text.replace('*', '').replace('#', '').replace('_', '')
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class AudioCache:
+    def __init__(self, directory=VOICE_CACHE_DIR, max_bytes=VOICE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def key(text, lang, backend="gtts"):
+        """Content address for already-normalized text in a language, per backend."""
+        return hashlib.sha256(f"{backend}\0{lang}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key, mime="audio/mp3"):
+        return os.path.join(self.directory, key + AUDIO_EXTENSIONS[mime])
+
+    def _entries(self):
+        """(path, size, mtime) for every cached clip."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(tuple(AUDIO_EXTENSIONS.values())):
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, text, lang, backend="gtts", mime="audio/mp3"):
+        path = self._path(self.key(text, lang, backend), mime)
+        with self.lock:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            # Mark as recently used for LRU eviction
+            os.utime(path)
+            self.hits += 1
+            return data
+
+    def put(self, text, lang, data, backend="gtts", mime="audio/mp3"):
+        path = self._path(self.key(text, lang, backend), mime)
+        with self.lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.total_bytes += len(data) - previous
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bytes": self.total_bytes, "max_bytes": self.max_bytes}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide audio cache, created on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AudioCache()
+        return _default_cache
+
+
+# --- Backends ------------------------------------------------------------------
+# A backend has a `name`, the `mime` type of the audio it returns, whether its
+# output is worth caching, and synthesize(text, lang) -> bytes, raising on failure
+# (empty bytes when it has no voice for the language).
+
+class GTTSBackend:
+    """Google Translate TTS (MP3, needs network access)."""
+    name = "gtts"
+    mime = "audio/mp3"
+    cacheable = True
+    # Languages gTTS has no voice for, read with the closest one that shares the
+    # script. Others (Odia, Santali, Manipuri) have no voice that can read their
+    # script at all, so they are left silent rather than read as English.
+    FALLBACK_LANGS = {"as": "bn", "mai": "hi", "ne": "hi", "sa": "hi", "kok": "mr", "sd": "ur", "ks": "ur"}
+
+    def __init__(self):
+        from gtts import gTTS
+        from gtts.lang import tts_langs
+        self._gtts = gTTS
+        self.supported = set(tts_langs())
+
+    def voice_lang(self, lang):
+        """gTTS language code to read `lang` with, or None if no voice can read it."""
+        if lang in self.supported:
+            return lang
+        fallback = self.FALLBACK_LANGS.get(lang)
+        return fallback if fallback in self.supported else None
+
+    def synthesize(self, text, lang):
+        lang = self.voice_lang(lang)
+        if lang is None:
+            return b""
+        tts = self._gtts(text=text, lang=lang, slow=False, timeout=TTS_TIMEOUT)
+        fp = io.BytesIO()
+        tts.write_to_fp(fp)
+        return fp.getvalue()
+
+
+class EspeakBackend:
+    """Local espeak-ng / espeak synthesizer (WAV, works offline)."""
+    name = "espeak"
+    mime = "audio/wav"
+    cacheable = True
+
+    def __init__(self, executable=None):
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.executable:
+            raise RuntimeError("espeak-ng is not installed (apt install espeak-ng)")
+
+    def synthesize(self, text, lang):
+        result = subprocess.run(
+            [self.executable, "--stdout", "-v", lang, text],
+            capture_output=True, check=True, timeout=TTS_TIMEOUT
+        )
+        return result.stdout
+
+
+class SilentBackend:
+    """No-op backend: silence roughly as long as the text would take to read."""
+    name = "none"
+    mime = "audio/wav"
+    cacheable = False
+    SAMPLE_RATE = 8000
+    SECONDS_PER_CHAR = 0.06
+
+    def synthesize(self, text, lang):
+        frames = int(len(text) * self.SECONDS_PER_CHAR * self.SAMPLE_RATE)
+        fp = io.BytesIO()
+        with wave.open(fp, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(1)
+            w.setframerate(self.SAMPLE_RATE)
+            w.writeframes(b"\x80" * frames)  # 8-bit PCM is unsigned; 0x80 is the zero level
+        return fp.getvalue()
+
+
+BACKENDS = {"gtts": GTTSBackend, "espeak": EspeakBackend, "none": SilentBackend}
+_backends = {}
+
+
+def get_backend(name=None):
+    """
+    Shared instance of a backend by name (ECOPAY_TTS_BACKEND by default). A
+    backend that can't start (espeak not installed, gTTS missing) is logged and
+    replaced by SilentBackend, so speech never takes the text features down.
+    """
+    name = name or TTS_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend {name!r}; choose from {', '.join(BACKENDS)}")
+    with _default_cache_lock:
+        if name not in _backends:
+            try:
+                _backends[name] = BACKENDS[name]()
+            except Exception as e:
+                print(f"TTS Error: {name} backend unavailable, falling back to silence: {e}")
+                _backends[name] = SilentBackend()
+        return _backends[name]
+
+
+def synthesize(text, lang, cache=None, backend=None):
+    """
+    Audio bytes (in backend.mime format) for `text` in `lang`, served from the
+    audio cache when this exact (normalized) phrase was spoken before.
+    Raises whatever the backend raises.
+    """
+    backend = backend or get_backend()
+    clean_text = normalize_text(text)
+    if not backend.cacheable:
+        return backend.synthesize(clean_text, lang)
+    cache = cache or get_cache()
+    audio = cache.get(clean_text, lang, backend.name, backend.mime)
+    if audio is None:
+        audio = backend.synthesize(clean_text, lang)
+        if audio:
+            cache.put(clean_text, lang, audio, backend.name, backend.mime)
+    return audio
+
+
+def prewarm(messages, lang="en", detect_language=None, cache=None, backend=None):
+    """
+    Synthesizes canned messages ahead of time. Each message goes through a
+    SpeechPipeline, so it is cached sentence by sentence under the same keys a
+    pipeline speaking it later looks up. Returns how many are now cached.
+    """
+    backend = backend or get_backend()
+    if not backend.cacheable:
+        return 0
+    cached = 0
+    for message in messages:
+        speech = SpeechPipeline(lang, detect_language, cache, backend=backend)
+        speech.feed(message)
+        speech.close()
+        if not all(future.result() for future in speech.futures):
+            # Most likely offline; the rest would fail the same way
+            print("TTS pre-warm stopped: synthesis failed")
+            break
+        cached += 1
+    return cached
+
+
+# -----------------------------------------------------------------------------
+# SENTENCE-LEVEL SPEECH PIPELINE
+# -----------------------------------------------------------------------------
+# Text is fed in as it streams from the LLM. Every completed sentence is sent to
+# the TTS pool right away, so the first clip is usually ready before the reply
+# has finished generating, and later sentences synthesize while earlier ones play.
+
+_executor = None
+
+
+def get_executor():
+    """Thread pool shared by all speech pipelines in this process."""
+    global _executor
+    with _default_cache_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+        return _executor
+
+
+class SpeechPipeline:
+    def __init__(self, lang="en", detect_language=None, cache=None, executor=None, backend=None):
+        self.lang = lang
+        # Optional callable(text) -> language code, applied per sentence
+        self.detect_language = detect_language
+        self.cache = cache
+        self.backend = backend or get_backend()
+        self.mime = self.backend.mime
+        self.executor = executor or get_executor()
+        self.buffer = ""
+        self.futures = []
+        self.closed = False
+
+    def feed(self, text):
+        """Adds streamed text; every sentence it completes is queued for synthesis."""
+        self.buffer += text
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            if len(normalize_text(self.buffer[start:match.start()])) >= MIN_SENTENCE_CHARS:
+                self._submit(self.buffer[start:match.start()])
+                start = match.end()
+        self.buffer = self.buffer[start:]
+
+    def close(self):
+        """Queues whatever text is left once the reply is complete."""
+        if not self.closed:
+            self.closed = True
+            self._submit(self.buffer)
+            self.buffer = ""
+
+    def _submit(self, sentence):
+        sentence = normalize_text(sentence)
+        # Skip fragments with nothing to pronounce (e.g. only emoji or punctuation)
+        if not any(ch.isalnum() for ch in sentence):
+            return
+        lang = self.detect_language(sentence) if self.detect_language else self.lang
+        self.futures.append(self.executor.submit(self._synthesize, sentence, lang))
+
+    def _synthesize(self, sentence, lang):
+        try:
+            return synthesize(sentence, lang, self.cache, self.backend)
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            return b""
+
+    def ready_clips(self):
+        """Audio for the leading run of finished sentences, in reply order (never blocks)."""
+        clips = []
+        for future in self.futures:
+            if not future.done():
+                break
+            clips.append(future.result())
+        return clips
+
+    def done(self):
+        return self.closed and all(f.done() for f in self.futures)
+
+    def audio(self):
+        """Waits for every sentence and returns the whole reply as one clip."""
+        self.close()
+        return join_audio([f.result() for f in self.futures], self.mime)
+
+
+MP3_BITRATES_KBPS = {
+    # (MPEG-1, Layer III) and (MPEG-2/2.5, Layer III) bitrate tables
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+
+def mp3_duration(data):
+    """Approximate length in seconds of constant-bitrate MP3 bytes (None if unparseable)."""
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        offset = 10 + size
+    while offset + 4 <= len(data):
+        if data[offset] == 0xFF and data[offset + 1] & 0xE0 == 0xE0:
+            version_bits = (data[offset + 1] >> 3) & 0x03
+            bitrate_index = data[offset + 2] >> 4
+            table = MP3_BITRATES_KBPS[1 if version_bits == 3 else 2]
+            if 0 < bitrate_index < len(table):
+                return (len(data) - offset) * 8 / (table[bitrate_index] * 1000)
+        offset += 1
+    return None
+
+
+def wav_duration(data):
+    with wave.open(io.BytesIO(data), "rb") as w:
+        return w.getnframes() / w.getframerate()
+
+
+def audio_duration(data, mime="audio/mp3"):
+    """Approximate length in seconds of an audio clip (None if unknown)."""
+    try:
+        return wav_duration(data) if mime == "audio/wav" else mp3_duration(data)
+    except (wave.Error, EOFError):
+        return None
+
+
+def join_audio(clips, mime="audio/mp3"):
+    """
+    Concatenates clips into one playable stream. MP3 frames can simply be
+    appended; WAV clips are re-muxed under a single header.
+    """
+    clips = [c for c in clips if c]
+    if mime != "audio/wav" or len(clips) < 2:
+        return b"".join(clips)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        for i, clip in enumerate(clips):
+            with wave.open(io.BytesIO(clip), "rb") as reader:
+                if i == 0:
+                    writer.setparams(reader.getparams())
+                writer.writeframes(reader.readframes(reader.getnframes()))
+    return out.getvalue()
+
+
+class ProgressivePlayback:
+    """
+    Plays a growing list of clips through a single player. `render(audio,
+    start_time)` is called with everything available so far, resuming at the
+    current playback position; it's only re-rendered when the loaded audio is
+    about to run out, so playback isn't restarted for every sentence.
+    """
+
+    SWAP_MARGIN = 1.5  # seconds of loaded audio left when more is swapped in
+
+    def __init__(self, render, mime="audio/mp3"):
+        self.render = render
+        self.mime = mime
+        self.started_at = None  # wall-clock time the current render began playing
+        self.loaded = 0
+        self.loaded_duration = 0.0
+        self.start_time = 0.0  # offset into the audio the current render started at
+
+    def position(self, now=None):
+        """
+        Current playback offset in seconds. The player stops at the end of what
+        it was given, so the offset never runs past the loaded duration (when
+        synthesis falls behind, the next render resumes exactly there).
+        """
+        if self.started_at is None:
+            return 0.0
+        position = self.start_time + ((now or time.monotonic()) - self.started_at)
+        return min(position, self.loaded_duration) if self.loaded_duration else position
+
+    def update(self, clips, final=False):
+        if len(clips) <= self.loaded:
+            return
+        now = time.monotonic()
+        position = self.position(now)
+        if self.loaded and not final and position < self.loaded_duration - self.SWAP_MARGIN:
+            return
+        audio = join_audio(clips, self.mime)
+        if not audio:
+            return  # every sentence so far failed to synthesize: nothing to play yet
+        self.start_time = position if self.loaded else 0.0
+        self.started_at = now
+        self.loaded = len(clips)
+        self.loaded_duration = audio_duration(audio, self.mime) or 0.0
+        self.render(audio, self.start_time)
+
+    def follow(self, pipeline, poll_interval=0.1):
+        """Keeps the player fed until every sentence of a closed pipeline is synthesized."""
+        pipeline.close()
+        while not pipeline.done():
+            self.update(pipeline.ready_clips())
+            time.sleep(poll_interval)
+        self.update(pipeline.ready_clips(), final=True)
+
+
+if __name__ == "__main__":
+    # Latency benchmark per backend (cache bypassed): python voice.py [backend ...]
+    import sys
+
+    samples = [
+        "Carpooling reduces individual footprint by about forty percent for daily commutes.",
+        "Switch to LED bulbs to cut lighting energy by seventy five percent.",
+        "Your authorized SIPs have completely neutralized your tracked carbon footprint!",
+    ]
+    for name in sys.argv[1:] or list(BACKENDS):
+        try:
+            backend = get_backend(name)
+            if backend.name != name:
+                raise RuntimeError("backend could not start")
+            chars, started = 0, time.perf_counter()
+            for text in samples:
+                backend.synthesize(text, "en")
+                chars += len(text)
+            elapsed = time.perf_counter() - started
+            print(f"{name:8s} {elapsed * 1000 / chars:8.3f} ms/char  ({elapsed:.2f}s for {chars} chars)")
+        except Exception as e:
+            print(f"{name:8s} unavailable: {e}")